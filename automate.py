@@ -1,25 +1,2039 @@
-import requests
-from urllib.parse import urljoin, urlparse, urlunparse
-from bs4 import BeautifulSoup
+from __future__ import annotations
+
+from urllib.parse import urljoin, urlparse, urlsplit, urlunparse, urlunsplit
+from array import array
+from html.parser import HTMLParser
+import codecs
 import concurrent.futures
-import openai
+import difflib
+import functools
+import heapq
+import itertools
 import os
+import random
 import re
-from collections import defaultdict
-import argparse
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+import gzip
 import hashlib
+import html
+import importlib
+import importlib.util
 import json
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import logging
+import ipaddress
+import math
+import socket
+import uuid
+import zlib
+
+
+class _LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Like 'import a.b', _LazyModule('a.b') imports the submodule and then
+    stands for the top-level package a.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            importlib.import_module(self._name)
+            self._module = sys.modules[self._name.partition('.')[0]]
+        return getattr(self._module, attr)
+
+
+def _optional_module(name: str) -> Optional[_LazyModule]:
+    """A lazily imported module, or None if it isn't installed"""
+    return _LazyModule(name) if importlib.util.find_spec(name.partition('.')[0]) else None
+
+
+# Heavy dependencies load when their subsystem is first used, keeping CLI startup fast.
+requests = _LazyModule('requests')
+urllib3 = _LazyModule('urllib3.util.connection')
+zstandard = _optional_module('zstandard')  # Fall back to zlib, which is always available
+dns = _optional_module('dns.resolver')  # --dns-server needs dnspython; the system resolver is used otherwise
+httpx = _optional_module('httpx')  # --http2 falls back to requests without httpx and h2
+np = _optional_module('numpy')  # Content similarity suggestions are skipped without NumPy
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class _TextFrame:
+    """
+    An open element on the streaming parser's stack, with its leading text
+
+    Text is kept up to max_chars characters. Link context also needs the
+    first max_words words, so while those are still missing collection goes
+    on, up to word_chars characters.
+    """
+    __slots__ = ('tag', 'attrs', 'parts', 'max_words', 'max_chars', 'word_chars', 'full', 'pending', 'words',
+                 'chars', 'in_word')
+
+    def __init__(self, tag: str, attrs: dict, max_words: int = None, max_chars: int = None,
+                 word_chars: int = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parts = []
+        self.max_words = max_words
+        self.max_chars = max_chars
+        self.word_chars = word_chars
+        self.full = False
+        self.pending = []  # Links whose parent element is this one
+        self.words = 0
+        self.chars = 0  # Not counting leading whitespace
+        self.in_word = False  # Whether the text so far ends inside a word
+
+    def _char_limit(self) -> Optional[int]:
+        if self.max_words is None or self.word_chars is None or self.words > self.max_words:
+            return self.max_chars
+        return max(self.max_chars or 0, self.word_chars)
+
+    def add_text(self, data: str):
+        """Append text until the character limit is reached and, within word_chars, the words are in"""
+        leading = 0 if self.chars else len(data) - len(data.lstrip())
+        limit = self._char_limit()
+        if limit is not None:
+            # One character past the limit is enough; the rest of a huge text node is never needed
+            data = data[:leading + limit + 1 - self.chars]
+        if not data:
+            return
+        self.words += len(data.split()) - (self.in_word and not data[0].isspace())
+        self.in_word = not data[-1].isspace()
+        self.chars += len(data) - leading
+        self.parts.append(data)
+        limit = self._char_limit()
+        self.full = limit is not None and self.chars > limit
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+class _LinkStreamParser(HTMLParser):
+    """
+    Incremental HTML parser that reports links and page structure as chunks arrive
+
+    Text is aggregated bottom-up: character data goes only to the innermost open
+    element, and each element hands its text to its parent when it closes.
+    Every element stops collecting once it has the leading text needed for link
+    context, headings and section previews, so the whole page costs one pass
+    and memory stays bounded regardless of page size or nesting depth.
+    <link> elements that point at other pages (rel=next, prev, canonical) are
+    reported with tag_name 'a' so they get the page policy, not the asset one.
+    """
+    LINK_TAGS = {'a', 'img', 'link', 'script', 'iframe', 'source'}
+    PAGE_LINK_RELS = {'next', 'prev', 'previous', 'canonical'}
+    HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    SECTION_TAGS = {'article', 'section', 'main', 'div'}
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                 'meta', 'param', 'source', 'track', 'wbr'}
+    SKIP_TEXT_TAGS = {'script', 'style'}
+    CONTEXT_WORDS = 20
+    PREVIEW_CHARS = 200
+    MAX_TEXT_CHARS = 1000
+
+    def __init__(self, on_link=None, on_context=None):
+        """
+        Args:
+            on_link: Called as on_link(href, tag_name) as soon as a link's tag is seen
+            on_context: Called as on_context(href, tag_name, anchor_text, surrounding_text)
+                once the link's parent element has been closed
+        """
+        super().__init__(convert_charrefs=True)
+        self.on_link = on_link
+        self.on_context = on_context
+        self.title = None
+        self.headings = []
+        self.sections = {}
+        self._stack = [_TextFrame('[document]', {}, max_words=self.CONTEXT_WORDS, max_chars=self.PREVIEW_CHARS,
+                                  word_chars=self.MAX_TEXT_CHARS)]
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        link = None
+        if tag in self.LINK_TAGS:
+            href = attrs.get('href') or attrs.get('src') or attrs.get('data-src')
+            if href:
+                tag_name = tag
+                if tag == 'link' and self.PAGE_LINK_RELS.intersection((attrs.get('rel') or '').lower().split()):
+                    tag_name = 'a'
+                link = {'href': href, 'tag_name': tag_name, 'anchor_text': ''}
+                self._stack[-1].pending.append(link)
+                if self.on_link:
+                    self.on_link(href, tag_name)
+
+        if tag in self.VOID_TAGS:
+            return
+
+        if tag in self.HEADING_TAGS or tag == 'title' or tag == 'a':
+            frame = _TextFrame(tag, attrs, max_words=self.CONTEXT_WORDS, max_chars=self.MAX_TEXT_CHARS,
+                               word_chars=self.MAX_TEXT_CHARS)
+        else:
+            # Every element keeps enough for a section preview, since it may be inside one
+            frame = _TextFrame(tag, attrs, max_words=self.CONTEXT_WORDS, max_chars=self.PREVIEW_CHARS,
+                               word_chars=self.MAX_TEXT_CHARS)
+        if link is not None:
+            frame.attrs['_link'] = link
+        self._stack.append(frame)
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        for depth in range(len(self._stack) - 1, 0, -1):
+            if self._stack[depth].tag == tag:
+                while len(self._stack) > depth:
+                    self._finish(self._stack.pop())
+                return
+
+    def handle_data(self, data):
+        frame = self._stack[-1]
+        if not frame.full and frame.tag not in self.SKIP_TEXT_TAGS:
+            frame.add_text(data)
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._finish(self._stack.pop())
+
+    def _finish(self, frame: _TextFrame):
+        """Emit everything that was waiting on this element's text"""
+        text = frame.text
+        link = frame.attrs.get('_link')
+        if link is not None and frame.tag == 'a':
+            link['anchor_text'] = text.strip()[:self.MAX_TEXT_CHARS]
+
+        if frame.pending and self.on_context:
+            surrounding_text = ' '.join(text.split()[:self.CONTEXT_WORDS])
+            for pending in frame.pending:
+                self.on_context(pending['href'], pending['tag_name'], pending['anchor_text'], surrounding_text)
+
+        if frame.tag in self.HEADING_TAGS:
+            self.headings.append(text.strip()[:self.MAX_TEXT_CHARS])
+        elif frame.tag == 'title' and self.title is None:
+            self.title = text[:self.MAX_TEXT_CHARS]
+        elif frame.tag in self.SECTION_TAGS and 'id' in frame.attrs:
+            self.sections[frame.attrs['id']] = text.strip()[:self.PREVIEW_CHARS] + "..."  # Store preview
+
+        # Pass the text up; the parent is already on top of the stack
+        if self._stack and not self._stack[-1].full and frame.tag not in self.SKIP_TEXT_TAGS:
+            self._stack[-1].add_text(text)
+
+
+class URLCanonicalizer:
+    """
+    Resolve hrefs and canonicalize them so equivalent spellings compare equal
+
+    Results are memoized per (base, href) in a bounded LRU cache, since the
+    same hrefs repeat on nearly every page of a site.
+    """
+    DEFAULT_PORTS = {'http': 80, 'https': 443}
+    UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+    PERCENT_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+    def __init__(self, lowercase_host: bool = True, strip_default_port: bool = True,
+                 strip_query: bool = True, strip_trailing_slash: bool = True,
+                 normalize_percent_encoding: bool = True,
+                 index_files=('index.html', 'index.htm', 'index.php', 'default.aspx'),
+                 memo_size: int = 1 << 16):
+        """
+        Args:
+            lowercase_host: Lowercase the scheme and host
+            strip_default_port: Drop :80 for http and :443 for https
+            strip_query: Drop the query string (fragments are always dropped)
+            strip_trailing_slash: Drop trailing slashes from the URL
+            normalize_percent_encoding: Decode escaped unreserved characters and uppercase other escapes
+            index_files: Final path segments that are equivalent to their directory
+            memo_size: Maximum number of memoized (base, href) pairs
+        """
+        self.lowercase_host = lowercase_host
+        self.strip_default_port = strip_default_port
+        self.strip_query = strip_query
+        self.strip_trailing_slash = strip_trailing_slash
+        self.normalize_percent_encoding = normalize_percent_encoding
+        self.index_files = frozenset(index_files)
+        self._memo = functools.lru_cache(maxsize=memo_size)(self._canonicalize)
+
+    def canonicalize(self, href: str, base: str = '') -> Optional[str]:
+        """
+        Resolve href against base and return its canonical form
+
+        Returns:
+            The canonical absolute URL, or None if it has no scheme or host
+        """
+        return self._memo(base, href)
+
+    def cache_info(self):
+        """Memo hit/miss statistics"""
+        return self._memo.cache_info()
+
+    def _unescape(self, match) -> str:
+        char = chr(int(match.group(1), 16))
+        return char if char in self.UNRESERVED else '%' + match.group(1).upper()
+
+    def _canonicalize(self, base: str, href: str) -> Optional[str]:
+        parts = urlsplit(urljoin(base, href) if base else href)
+        scheme, netloc, path, query = parts.scheme, parts.netloc, parts.path, parts.query
+        if not scheme or not netloc:
+            return None
+
+        if self.lowercase_host or self.strip_default_port:
+            userinfo, _, hostport = netloc.rpartition('@')
+            host, port = hostport, ''
+            if hostport.rfind(':') > hostport.rfind(']'):  # Ignore colons inside IPv6 literals
+                host, _, port = hostport.rpartition(':')
+            if self.lowercase_host:
+                scheme = scheme.lower()
+                host = host.lower()
+            if self.strip_default_port and port and port.isdigit() and int(port) == self.DEFAULT_PORTS.get(scheme):
+                port = ''
+            netloc = (userinfo + '@' if userinfo else '') + host + (':' + port if port else '')
+
+        if self.normalize_percent_encoding and '%' in path:
+            path = self.PERCENT_ESCAPE.sub(self._unescape, path)
+
+        if self.index_files:
+            directory, _, filename = path.rpartition('/')
+            if filename in self.index_files:
+                path = directory + '/'
+
+        url = urlunsplit((scheme, netloc, path, '' if self.strip_query else query, ''))
+        return url.rstrip('/') if self.strip_trailing_slash else url
+
+
+class LinkGraph:
+    """
+    Compact directed link graph: interned integer node IDs with CSR adjacency
+
+    Edges are collected into flat arrays and turned into compressed sparse row
+    form by build(), so graph queries never touch URL strings.
+    """
+
+    def __init__(self):
+        self.ids = {}  # url -> node id
+        self.urls = []  # node id -> url
+        self._edge_sources = array('i')
+        self._edge_targets = array('i')
+        self._out_offsets = self._out_targets = None
+        self._in_offsets = self._in_sources = None
+        self._components = None
+        self._stamps = array('l')
+        self._epoch = 0
+
+    @classmethod
+    def from_link_contexts(cls, link_contexts: dict) -> 'LinkGraph':
+        """Build a graph with an edge from every referrer to each link found on it"""
+        graph = cls()
+        for target, referrers in link_contexts.items():
+            for referrer in referrers:
+                graph.add_edge(referrer, target)
+        graph.build()
+        return graph
+
+    def __len__(self):
+        return len(self.urls)
+
+    def intern(self, url: str) -> int:
+        """Return the node id for url, assigning a new one if needed"""
+        node = self.ids.get(url)
+        if node is None:
+            node = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        return node
+
+    def add_edge(self, source: str, target: str):
+        self._edge_sources.append(self.intern(source))
+        self._edge_targets.append(self.intern(target))
+
+    @staticmethod
+    def _csr(node_count: int, keys: array, values: array) -> Tuple[array, array]:
+        """Counting-sort an edge list into (offsets, neighbours) arrays"""
+        offsets = array('l', bytes(array('l').itemsize * (node_count + 1)))
+        for key in keys:
+            offsets[key + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+        cursor = array('l', offsets)
+        neighbours = array('i', bytes(array('i').itemsize * len(keys)))
+        for key, value in zip(keys, values):
+            neighbours[cursor[key]] = value
+            cursor[key] += 1
+        return offsets, neighbours
+
+    def build(self):
+        """Freeze the edges added so far into forward and reverse CSR arrays"""
+        count = len(self.urls)
+        self._out_offsets, self._out_targets = self._csr(count, self._edge_sources, self._edge_targets)
+        self._in_offsets, self._in_sources = self._csr(count, self._edge_targets, self._edge_sources)
+        self._components = None
+
+    def successors(self, node: int) -> array:
+        return self._out_targets[self._out_offsets[node]:self._out_offsets[node + 1]]
+
+    def predecessors(self, node: int) -> array:
+        return self._in_sources[self._in_offsets[node]:self._in_offsets[node + 1]]
+
+    def in_degree(self, url: str) -> int:
+        node = self.ids.get(url)
+        if node is None:
+            return 0
+        return self._in_offsets[node + 1] - self._in_offsets[node]
+
+    def _traverse(self, start_nodes, offsets: array, neighbours: array) -> list:
+        """Breadth-first search, returning every node reached including the start nodes"""
+        # Visit marks are epoch stamps, so repeated searches never clear or reallocate them
+        if len(self._stamps) < len(self.urls):
+            self._stamps = array('l', bytes(array('l').itemsize * len(self.urls)))
+        self._epoch += 1
+        epoch, stamps = self._epoch, self._stamps
+        reached = list(start_nodes)
+        for node in reached:
+            stamps[node] = epoch
+        for node in reached:  # Grows while iterating, giving breadth-first order
+            for neighbour in neighbours[offsets[node]:offsets[node + 1]]:
+                if stamps[neighbour] != epoch:
+                    stamps[neighbour] = epoch
+                    reached.append(neighbour)
+        return reached
+
+    def reachable(self, start_url: str) -> set:
+        """URLs reachable by following links from start_url"""
+        if start_url not in self.ids:
+            return set()
+        reached = self._traverse([self.ids[start_url]], self._out_offsets, self._out_targets)
+        return {self.urls[node] for node in reached}
+
+    def orphan_pages(self, pages, root: str) -> set:
+        """Pages that no other page links to, apart from the root"""
+        orphans = set()
+        for page in pages:
+            node = self.ids.get(page)
+            if page == root:
+                continue
+            if node is None or all(source == node for source in self.predecessors(node)):
+                orphans.add(page)
+        return orphans
+
+    def _strong_components(self) -> Tuple[List[List[int]], array]:
+        """
+        Strongly connected components, each listed after every component it links to
+
+        Iterative Tarjan over the forward CSR arrays, computed once per build().
+
+        Returns:
+            (components, component index of every node)
+        """
+        if self._components is not None:
+            return self._components
+        count = len(self.urls)
+        offsets, targets = self._out_offsets, self._out_targets
+        index = array('l', [-1]) * count
+        low = array('l', bytes(array('l').itemsize * count))
+        on_stack = bytearray(count)
+        stack, components, counter = [], [], 0
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [[root, offsets[root]]]  # [node, next edge to follow]
+            while work:
+                frame = work[-1]
+                node, edge = frame
+                if edge < offsets[node + 1]:
+                    frame[1] += 1
+                    successor = targets[edge]
+                    if index[successor] == -1:
+                        index[successor] = low[successor] = counter
+                        counter += 1
+                        stack.append(successor)
+                        on_stack[successor] = 1
+                        work.append([successor, offsets[successor]])
+                    elif on_stack[successor] and index[successor] < low[node]:
+                        low[node] = index[successor]
+                    continue
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        component_of = array('i', bytes(array('i').itemsize * count))
+        for number, component in enumerate(components):
+            for node in component:
+                component_of[node] = number
+        self._components = (components, component_of)
+        return self._components
+
+    @staticmethod
+    def _add_counts(planes: list, mask: int, weight: int):
+        """Add weight to the counter of every bit set in mask; planes[k] holds bit k of all counters"""
+        shift = 0
+        while weight:
+            if weight & 1:
+                carry, k = mask, shift
+                while carry:
+                    if k >= len(planes):
+                        planes.extend([0] * (k + 1 - len(planes)))
+                    planes[k], carry = planes[k] ^ carry, planes[k] & carry
+                    k += 1
+            weight >>= 1
+            shift += 1
+
+    def broken_link_impact(self, broken_urls, bits_per_pass: int = 4096) -> Dict[str, int]:
+        """
+        Count the pages transitively affected by each broken URL
+
+        A page is affected if following links from it can lead to the broken URL.
+        All broken URLs are handled in one pass over the strongly connected
+        components, sinks first: each component gets a bitmask of the broken
+        URLs it can reach, the union of its successors' masks, and masks are
+        summed into bit-sliced counters weighted by component size. That costs
+        O(N + E) big-integer operations per bits_per_pass broken URLs, instead
+        of a traversal per broken URL.
+        """
+        impact = {url: 0 for url in broken_urls}
+        nodes = [(url, self.ids[url]) for url in impact if url in self.ids]
+        if not nodes:
+            return impact
+        components, component_of = self._strong_components()
+        offsets, targets = self._out_offsets, self._out_targets
+        for start in range(0, len(nodes), bits_per_pass):
+            chunk = nodes[start:start + bits_per_pass]
+            own = {node: 1 << bit for bit, (_, node) in enumerate(chunk)}
+            masks, planes = [], []
+            for number, component in enumerate(components):
+                mask = 0
+                for node in component:
+                    mask |= own.get(node, 0)
+                    for successor in targets[offsets[node]:offsets[node + 1]]:
+                        other = component_of[successor]
+                        if other != number:
+                            mask |= masks[other]
+                masks.append(mask)
+                if mask:
+                    self._add_counts(planes, mask, len(component))
+            for bit, (url, _) in enumerate(chunk):
+                # Every broken URL reaches itself, which is not an affected page
+                impact[url] = sum(((plane >> bit) & 1) << k for k, plane in enumerate(planes)) - 1
+        return impact
+
+
+class SharedStatusCache:
+    """
+    Link status cache shared by every agent and site on the machine
+
+    Backed by SQLite in WAL mode so several processes can read concurrently.
+    Entries are keyed by canonical URL and expire per status class: failures
+    after the agent's NEGATIVE_CACHE_TTLS, successes after SUCCESS_TTL.
+    """
+    SUCCESS_TTL = 7 * 24 * 3600
+
+    def __init__(self, path: str, ttls: dict = None):
+        """
+        Args:
+            path: SQLite file, e.g. in the agent's cache directory
+            ttls: Overrides by failure kind, None for successful checks
+        """
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {None: self.SUCCESS_TTL, **AILinkRepairAgent.NEGATIVE_CACHE_TTLS, **(ttls or {})}
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS link_status (
+                    url TEXT PRIMARY KEY,
+                    status,
+                    final_url TEXT,
+                    error TEXT,
+                    kind TEXT,
+                    expires_at REAL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, since checks run on a thread pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[tuple]:
+        """
+        Returns:
+            (url, status, final_url, error, kind) if a fresh entry exists, else None
+        """
+        row = self._connect().execute(
+            "SELECT status, final_url, error, kind FROM link_status WHERE url = ? AND expires_at > ?",
+            (url, time.time())
+        ).fetchone()
+        return (url,) + row if row else None
+
+    def put(self, url: str, status, final_url: Optional[str], error: Optional[str], kind: Optional[str]):
+        ttl = self.ttls.get(kind, self.ttls['error'])
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO link_status VALUES (?, ?, ?, ?, ?, ?)",
+                (url, status, final_url, error, kind, time.time() + ttl)
+            )
+
+
+class ArchiveMiss(OSError):
+    """A replayed request has no recorded response; handled like a requests error"""
+
+
+class HTTPArchive:
+    """
+    Record/replay archive of raw HTTP responses in WARC-style records
+
+    Every response, including each redirect hop, is written as a WARC/1.1
+    'response' record holding the status line, headers and body, compressed
+    as its own gzip member and appended to the archive file. A JSON-lines
+    index next to it (<path>.idx) maps each request to the offsets of its
+    records, so replay reads only the records it needs. Bodies are stored
+    decoded, without their Content-Encoding. Requests that failed, e.g. with
+    a timeout, get a 'metadata' record and replay raises the same exception.
+    """
+    DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+    def __init__(self, path: str, mode: str = 'replay'):
+        """
+        Args:
+            path: Archive file; record mode starts it afresh
+            mode: 'record' to capture live responses, 'replay' to serve them with no network
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown archive mode: {mode}")
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.idx')
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index = {}
+        if mode == 'record':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'wb')
+            self._index_file = open(self.index_path, 'w')
+        else:
+            with open(self.index_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._index[entry['key']] = entry['records']
+            self._file = open(self.path, 'rb')
+
+    @staticmethod
+    def request_key(method: str, url: str, headers: dict = None) -> str:
+        """Index key of a request; range requests are kept apart from full ones"""
+        byte_range = (headers or {}).get('Range')
+        return f"{method.upper()} {url}" + (f" {byte_range}" if byte_range else '')
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _encode(self, response: requests.Response) -> bytes:
+        body = response.content or b''
+        headers = ''.join(f"{name}: {value}\r\n" for name, value in response.headers.items()
+                          if name.lower() not in self.DROPPED_HEADERS)
+        block = (f"HTTP/1.1 {response.status_code} {response.reason or ''}\r\n{headers}"
+                 f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1', errors='replace') + body
+        return self._member('response', response.url, 'application/http; msgtype=response', block)
+
+    @staticmethod
+    def _member(record_type: str, target: str, content_type: str, block: bytes) -> bytes:
+        warc_headers = (
+            "WARC/1.1\r\n"
+            f"WARC-Type: {record_type}\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\r\n"
+            f"WARC-Target-URI: {target}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(block)}\r\n\r\n"
+        ).encode('utf-8')
+        return gzip.compress(warc_headers + block + b"\r\n\r\n", compresslevel=6)
+
+    def record(self, key: str, response: requests.Response):
+        """Append a response and its redirect history under a request key"""
+        self._append(key, [self._encode(hop) for hop in response.history + [response]])
+
+    def record_error(self, key: str, url: str, exc: requests.RequestException):
+        """Append a failed request, so replay raises the same exception"""
+        block = json.dumps({'error': type(exc).__name__, 'message': str(exc)}).encode('utf-8')
+        self._append(key, [self._member('metadata', url, 'application/json', block)])
+
+    def _append(self, key: str, members: List[bytes]):
+        with self._lock:
+            records = []
+            for member in members:
+                records.append([self._file.tell(), len(member)])
+                self._file.write(member)
+            self._file.flush()
+            self._index[key] = records
+            self._index_file.write(json.dumps({'key': key, 'records': records}) + "\n")
+            self._index_file.flush()
+
+    def _decode(self, member: bytes) -> requests.Response:
+        data = gzip.decompress(member)
+        warc_headers, _, data = data.partition(b"\r\n\r\n")
+        target = re.search(rb"^WARC-Target-URI: (.*)$", warc_headers, re.M).group(1).strip().decode('utf-8')
+        if re.search(rb"^WARC-Type: metadata", warc_headers, re.M):
+            failure = json.loads(data.rstrip(b"\r\n"))
+            raise getattr(requests.exceptions, failure['error'], requests.RequestException)(failure['message'])
+        http_headers, _, body = data.partition(b"\r\n\r\n")
+        lines = http_headers.decode('latin-1').split("\r\n")
+        _, status, reason = (lines[0].split(' ', 2) + [''])[:3]
+
+        response = requests.Response()
+        response.status_code = int(status)
+        response.reason = reason
+        response.url = target
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            response.headers[name.strip()] = value.strip()
+        response._content = body[:int(response.headers.get('Content-Length', len(body)))]
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def replay(self, key: str) -> requests.Response:
+        """
+        Rebuild a recorded response, with its redirect history
+
+        Raises:
+            ArchiveMiss: If the request was not recorded
+            requests.RequestException: The recorded failure, if the request failed
+        """
+        records = self._index.get(key)
+        if records is None:
+            raise ArchiveMiss(f"Not in archive: {key}")
+        hops = [self._decode(os.pread(self._file.fileno(), length, offset)) for offset, length in records]
+        response = hops[-1]
+        response.history = hops[:-1]
+        return response
+
+    def close(self):
+        self._file.close()
+        if self.mode == 'record':
+            self._index_file.close()
+
+
+class FixTable:
+    """
+    Verified broken URL -> replacement mappings kept across runs
+
+    suggest_fixes stores the fixes whose replacement URLs checked out live,
+    keyed by the best replacement. Later runs reuse them after re-checking
+    the replacements, instead of proposing candidates, or asking the model,
+    again.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        # Like the other stores, so concurrent runs sharing a cache_dir don't block each other
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fixes (
+                    broken_url TEXT PRIMARY KEY,
+                    replacement_url TEXT,
+                    fixes TEXT,
+                    verified_at REAL
+                )
+            """)
+
+    def get(self, broken_url: str) -> Optional[Tuple[str, List[dict]]]:
+        """
+        Returns:
+            (best replacement URL, fixes) if the broken URL has been fixed before, else None
+        """
+        row = self._conn.execute("SELECT replacement_url, fixes FROM fixes WHERE broken_url = ?",
+                                 (broken_url,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def put(self, broken_url: str, replacement_url: str, fixes: List[dict]):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO fixes VALUES (?, ?, ?, ?)",
+                               (broken_url, replacement_url, json.dumps(fixes), time.time()))
+
+    def delete(self, broken_url: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM fixes WHERE broken_url = ?", (broken_url,))
+
+    def close(self):
+        self._conn.close()
+
+
+class _HTTPXStream:
+    """Just enough of urllib3's response for requests.Response.iter_content over an httpx stream"""
+
+    def __init__(self, response):
+        self.response = response
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        try:
+            yield from self.response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise HTTP2Session.translate_error(e) from e
+        finally:
+            self.response.close()
+
+    def close(self):
+        self.response.close()
+
+    def release_conn(self):
+        self.response.close()
+
+
+class HTTP2Session:
+    """
+    requests.Session stand-in that sends requests over HTTP/2 with httpx
+
+    Requests to one origin are multiplexed as streams over a few shared
+    connections instead of each taking a pooled HTTP/1.1 connection. Servers
+    that don't offer h2 through ALPN, and plain http:// URLs, get HTTP/1.1
+    from httpx. Requests caught on a connection the server shuts down (e.g.
+    with GOAWAY) are resent on a new one, and a host that keeps breaking the
+    protocol is switched to the fallback requests session for the rest of
+    the run. Responses and exceptions are
+    converted to their requests equivalents, so callers can't tell the
+    backends apart.
+    """
+
+    def __init__(self, max_connections: int = 100, fallback: requests.Session = None, resends: int = 2,
+                 **client_kwargs):
+        """
+        Args:
+            max_connections: Connections kept across all hosts
+            fallback: Session for hosts where HTTP/2 failed
+            resends: Times a request is resent after its connection broke
+            client_kwargs: Passed on to httpx.Client, e.g. verify
+        """
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            **client_kwargs
+        )
+        self.fallback = fallback or requests.Session()
+        self.resends = resends
+        self._http1_hosts = set()
+
+    @staticmethod
+    def available() -> bool:
+        """Whether httpx and its HTTP/2 dependency h2 are installed"""
+        return httpx is not None and importlib.util.find_spec('h2') is not None
+
+    @staticmethod
+    def translate_error(exc: Exception) -> requests.RequestException:
+        """The requests exception matching an httpx one, so failures are classified the same way"""
+        if isinstance(exc, httpx.TimeoutException):
+            return requests.Timeout(str(exc))
+        if isinstance(exc, httpx.TooManyRedirects):
+            return requests.TooManyRedirects(str(exc))
+        if isinstance(exc, (httpx.InvalidURL, httpx.UnsupportedProtocol)):
+            return requests.exceptions.InvalidURL(str(exc))
+        if isinstance(exc, httpx.TransportError):
+            return requests.ConnectionError(str(exc))
+        return requests.RequestException(str(exc))
+
+    def request(self, method: str, url: str, headers: dict = None, timeout: float = None,
+                allow_redirects: bool = True, stream: bool = False) -> requests.Response:
+        host = urlparse(url).netloc
+        if host not in self._http1_hosts:
+            for _ in range(self.resends + 1):
+                try:
+                    response = self.client.send(
+                        self.client.build_request(method, url, headers=headers, timeout=timeout),
+                        follow_redirects=allow_redirects,
+                        stream=stream
+                    )
+                    return self._convert(response, stream)
+                except (httpx.ReadError, httpx.WriteError, httpx.ProtocolError, KeyError) as e:
+                    # Every stream on a connection fails when the server closes it; only HEAD
+                    # and GET are sent, so resending is safe. httpcore can raise KeyError in
+                    # that case too.
+                    error = e
+                except (httpx.HTTPError, httpx.InvalidURL) as e:
+                    raise self.translate_error(e) from e
+            if not isinstance(error, (httpx.ProtocolError, KeyError)):
+                raise self.translate_error(error) from error
+            if host not in self._http1_hosts:
+                logger.warning(f"HTTP/2 keeps failing for {host}, using HTTP/1.1 from now on: {str(error)}")
+                self._http1_hosts.add(host)
+        return self.fallback.request(method, url, headers=headers, timeout=timeout,
+                                     allow_redirects=allow_redirects, stream=stream)
+
+    def _convert(self, response, stream: bool) -> requests.Response:
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.url = str(response.url)
+        converted.headers = requests.structures.CaseInsensitiveDict(response.headers.items())
+        converted.encoding = requests.utils.get_encoding_from_headers(converted.headers)
+        converted.history = [self._convert(hop, False) for hop in response.history]
+        if stream:
+            converted.raw = _HTTPXStream(response)
+        else:
+            try:
+                converted._content = response.content
+            except httpx.ResponseNotRead:
+                converted._content = b''
+            converted._content_consumed = True
+        return converted
+
+    def close(self):
+        self.client.close()
+        self.fallback.close()
+
+
+class SimilarityEngine:
+    """
+    Offline text similarity over hashed character trigram TF-IDF vectors
+
+    Texts are turned into dense vectors by hashing their byte trigrams into a
+    fixed number of buckets, entirely in NumPy. Queries are matched in batches
+    with one matrix product per batch and a partial sort for the top k. Query
+    batches shrink as the index grows, so a batch never scores more than
+    max_scores pairs. Requires NumPy.
+    """
+
+    def __init__(self, dims: int = 512, batch_size: int = 1024, max_scores: int = 1 << 24):
+        """
+        Args:
+            dims: Number of hash buckets per vector, a power of two
+            batch_size: Texts vectorized, or queries scored, per NumPy call
+            max_scores: Upper bound on query x indexed text scores per batch; with
+                the top-k indices a batch peaks at about 12 bytes per score, 200 MB
+                at the default
+        """
+        if np is None:
+            raise ImportError("SimilarityEngine requires NumPy")
+        if dims & (dims - 1):
+            raise ValueError("dims must be a power of two")
+        self.dims = dims
+        self.batch_size = batch_size
+        self.max_scores = max_scores
+        self._shift = 32 - (dims.bit_length() - 1)
+        self.idf = None
+        self.matrix = None
+
+    def _counts(self, texts: List[str]):
+        """Trigram bucket counts, one row per text"""
+        # Zero bytes separate the texts, and trigrams containing one are dropped
+        encoded = [text.lower().encode('utf-8', 'ignore').replace(b'\0', b' ') for text in texts]
+        data = np.frombuffer(b'\0\0'.join(encoded) + b'\0\0', dtype=np.uint8)
+        lengths = np.fromiter((len(e) + 2 for e in encoded), dtype=np.int64, count=len(encoded))
+        doc_ids = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)[:-2]
+
+        first, second, third = data[:-2], data[1:-1], data[2:]
+        valid = (first != 0) & (second != 0) & (third != 0)
+        codes = (first.astype(np.uint64) << 16) | (second.astype(np.uint64) << 8) | third
+        buckets = ((codes * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)) >> np.uint64(self._shift)
+
+        cells = doc_ids[valid] * self.dims + buckets[valid].astype(np.int64)
+        counts = np.bincount(cells, minlength=len(encoded) * self.dims)
+        return counts.reshape(len(encoded), self.dims).astype(np.float32)
+
+    def _vectorize(self, texts: List[str]):
+        """Normalized TF-IDF vectors using the fitted IDF weights"""
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            tf = np.log1p(self._counts(texts[start:start + self.batch_size]))
+            weighted = tf * self.idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            rows.append(weighted / np.maximum(norms, 1e-12))
+        return np.vstack(rows) if rows else np.zeros((0, self.dims), dtype=np.float32)
+
+    def fit(self, texts: List[str]) -> 'SimilarityEngine':
+        """Index the candidate texts that queries are matched against"""
+        document_frequency = np.zeros(self.dims, dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            document_frequency += (self._counts(texts[start:start + self.batch_size]) > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix = self._vectorize(texts)
+        return self
+
+    def query(self, texts: List[str], k: int = 3) -> List[List[Tuple[int, float]]]:
+        """
+        Find the k indexed texts most similar to each query text
+
+        Returns:
+            One list of (index, cosine similarity) per query, best first
+        """
+        k = min(k, len(self.matrix))
+        if k == 0:
+            return [[] for _ in texts]
+        results = []
+        batch_size = max(1, min(self.batch_size, self.max_scores // len(self.matrix)))
+        for start in range(0, len(texts), batch_size):
+            scores = self._vectorize(texts[start:start + batch_size]) @ self.matrix.T
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            results.extend(list(zip(row.tolist(), row_scores.tolist())) for row, row_scores in zip(top, top_scores))
+        return results
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that adds larger slices as it fills, keeping the overall
+    false-positive rate under error_rate however many items are added
+    """
+
+    def __init__(self, error_rate: float = 0.001, initial_capacity: int = 1 << 20, growth: int = 2,
+                 tightening: float = 0.5):
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.tightening = tightening
+        self._slices = []  # [bits, bit_count, hash_count, capacity, items]
+        self._add_slice()
+
+    def _add_slice(self):
+        index = len(self._slices)
+        capacity = self.initial_capacity * self.growth ** index
+        # Each slice gets a tighter error rate so the geometric series stays under error_rate
+        slice_error = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        bit_count = max(8, int(-capacity * math.log(slice_error) / (math.log(2) ** 2)))
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        self._slices.append([bytearray((bit_count + 7) // 8), bit_count, hash_count, capacity, 0])
+
+    @staticmethod
+    def _hashes(item: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        for bits, bit_count, hash_count, _, _ in self._slices:
+            for i in range(hash_count):
+                position = (h1 + i * h2) % bit_count
+                if not bits[position >> 3] & (1 << (position & 7)):
+                    break
+            else:
+                return True
+        return False
+
+    def add(self, item: str):
+        current = self._slices[-1]
+        if current[4] >= current[3]:
+            self._add_slice()
+            current = self._slices[-1]
+        bits, bit_count, hash_count = current[0], current[1], current[2]
+        h1, h2 = self._hashes(item)
+        for i in range(hash_count):
+            position = (h1 + i * h2) % bit_count
+            bits[position >> 3] |= 1 << (position & 7)
+        current[4] += 1
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(s[0]) for s in self._slices)
+
+
+class DiskVisitedSet:
+    """
+    Visited-URL set for very large crawls: a Bloom filter in memory answers
+    most lookups, and an exact SQLite set on disk confirms possible hits
+    """
+
+    def __init__(self, path: str, error_rate: float = 0.001, commit_every: int = 1000):
+        """
+        Args:
+            path: SQLite file holding the exact set; it is cleared on open
+            error_rate: Bloom filter false-positive rate, i.e. the share of
+                unvisited URLs that still need a disk lookup
+            commit_every: Inserts batched per transaction
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.error_rate = error_rate
+        self.commit_every = commit_every
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY)")
+        self.clear()
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self._filter:
+            return False
+        return self._conn.execute("SELECT 1 FROM visited WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, url: str):
+        if url in self:
+            return
+        self._filter.add(url)
+        self._conn.execute("INSERT INTO visited VALUES (?)", (url,))
+        self._count += 1
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for (url,) in self._conn.execute("SELECT url FROM visited"):
+            yield url
+
+    def clear(self):
+        self._conn.execute("DELETE FROM visited")
+        self._conn.commit()
+        self._filter = ScalableBloomFilter(error_rate=self.error_rate)
+        self._count = 0
+        self._uncommitted = 0
+
+
+class _StoredOccurrences:
+    """List-like view of one broken URL's occurrences in a SQLiteResultStore"""
+
+    def __init__(self, store: 'SQLiteResultStore', url: str):
+        self.store = store
+        self.url = url
+
+    def append(self, occurrence: dict):
+        self.store.write(
+            "INSERT INTO broken (url, referrer, status, final_url, error, kind) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.url, occurrence['referrer'], occurrence['status'], occurrence['final_url'], occurrence['error'],
+             occurrence.get('kind'))
+        )
+
+    def _rows(self, limit: int = -1):
+        for referrer, status, final_url, error, kind in self.store.read(
+                "SELECT referrer, status, final_url, error, kind FROM broken WHERE url = ? ORDER BY seq LIMIT ?",
+                (self.url, limit)):
+            yield {'referrer': referrer, 'status': status, 'final_url': final_url, 'error': error, 'kind': kind}
+
+    def __iter__(self):
+        return self._rows()
+
+    def __len__(self):
+        return self.store.query_one("SELECT COUNT(*) FROM broken WHERE url = ?", (self.url,))[0]
+
+    def __getitem__(self, index):
+        # The report only takes the first occurrence or a leading slice, which LIMIT covers
+        if isinstance(index, slice) and not index.start and index.step is None and index.stop is not None:
+            return list(self._rows(index.stop))
+        if index == 0:
+            rows = list(self._rows(1))
+            if rows:
+                return rows[0]
+        return list(self)[index]
+
+
+class _BrokenLinkMapping:
+    """Dict-like broken URL -> occurrences mapping stored on disk"""
+
+    def __init__(self, store: 'SQLiteResultStore'):
+        self.store = store
+
+    def __getitem__(self, url: str) -> _StoredOccurrences:
+        return _StoredOccurrences(self.store, url)
+
+    def __setitem__(self, url: str, occurrences):
+        del self[url]
+        view = self[url]
+        for occurrence in occurrences:
+            view.append(occurrence)
+
+    def __delitem__(self, url: str):
+        self.store.write("DELETE FROM broken WHERE url = ?", (url,))
+
+    def __contains__(self, url: str) -> bool:
+        return self.store.query_one("SELECT 1 FROM broken WHERE url = ? LIMIT 1", (url,)) is not None
+
+    def __len__(self):
+        return self.store.query_one("SELECT COUNT(DISTINCT url) FROM broken")[0]
+
+    def __iter__(self):
+        for (url,) in self.store.read("SELECT DISTINCT url FROM broken ORDER BY url"):
+            yield url
+
+    def keys(self):
+        return iter(self)
+
+    def get(self, url: str, default=None):
+        return self[url] if url in self else default
+
+    def items(self):
+        """Stream (url, occurrences) pairs grouped by broken URL"""
+        rows = self.store.read("SELECT url, referrer, status, final_url, error, kind FROM broken ORDER BY url, seq")
+        for url, group in itertools.groupby(rows, key=lambda row: row[0]):
+            yield url, [{'referrer': r[1], 'status': r[2], 'final_url': r[3], 'error': r[4], 'kind': r[5]}
+                        for r in group]
+
+    def clear(self):
+        self.store.write("DELETE FROM broken")
+
+
+class _StoredContexts:
+    """Dict-like view of the referrer -> context entries for one link in a SQLiteResultStore"""
+
+    def __init__(self, store: 'SQLiteResultStore', url: str):
+        self.store = store
+        self.url = url
+
+    def __setitem__(self, referrer: str, context: dict):
+        self.store.write("INSERT OR REPLACE INTO contexts VALUES (?, ?, ?)", (self.url, referrer, json.dumps(context)))
+
+    def get(self, referrer: str, default=None):
+        row = self.store.query_one("SELECT data FROM contexts WHERE url = ? AND referrer = ?",
+                                   (self.url, referrer))
+        return json.loads(row[0]) if row else default
+
+    def __getitem__(self, referrer: str) -> dict:
+        context = self.get(referrer)
+        if context is None:
+            raise KeyError(referrer)
+        return context
+
+    def __contains__(self, referrer: str) -> bool:
+        return self.get(referrer) is not None
+
+    def __len__(self):
+        return self.store.query_one("SELECT COUNT(*) FROM contexts WHERE url = ?", (self.url,))[0]
+
+    def items(self):
+        for referrer, data in self.store.read("SELECT referrer, data FROM contexts WHERE url = ?", (self.url,)):
+            yield referrer, json.loads(data)
+
+    def keys(self):
+        for referrer, _ in self.items():
+            yield referrer
+
+    def values(self):
+        for _, context in self.items():
+            yield context
+
+    def __iter__(self):
+        return self.keys()
+
+
+class _LinkContextMapping:
+    """Dict-like link -> {referrer: context} mapping stored on disk"""
+
+    def __init__(self, store: 'SQLiteResultStore'):
+        self.store = store
+
+    def __getitem__(self, url: str) -> _StoredContexts:
+        return _StoredContexts(self.store, url)
+
+    def __contains__(self, url: str) -> bool:
+        return self.store.query_one("SELECT 1 FROM contexts WHERE url = ? LIMIT 1", (url,)) is not None
+
+    def __len__(self):
+        return self.store.query_one("SELECT COUNT(DISTINCT url) FROM contexts")[0]
+
+    def __iter__(self):
+        for (url,) in self.store.read("SELECT DISTINCT url FROM contexts ORDER BY url"):
+            yield url
+
+    def keys(self):
+        return iter(self)
+
+    def get(self, url: str, default=None):
+        return self[url] if url in self else default
+
+    def items(self):
+        """Stream (url, {referrer: context}) pairs grouped by link"""
+        rows = self.store.read("SELECT url, referrer, data FROM contexts ORDER BY url")
+        for url, group in itertools.groupby(rows, key=lambda row: row[0]):
+            yield url, {referrer: json.loads(data) for _, referrer, data in group}
+
+    def clear(self):
+        self.store.write("DELETE FROM contexts")
+
+
+class SQLiteResultStore:
+    """
+    Append-only on-disk store for broken links and link contexts
+
+    Exposes broken_links and link_contexts as dict-like mappings that the
+    agent uses in place of its in-memory dicts, so memory use does not grow
+    with the number of results. Writes are batched into transactions.
+    Lookups and counts run on the write connection, which sees pending
+    writes without committing them; result sets are streamed through a
+    second connection, so iterating while the crawl keeps writing is safe.
+    """
+
+    def __init__(self, path: str, commit_every: int = 1000):
+        """
+        Args:
+            path: SQLite file; previous results in it are cleared
+            commit_every: Writes batched per transaction
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._writer = sqlite3.connect(self.path, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        # Results never outlive a run, so the tables are recreated rather than migrated
+        self._writer.executescript("""
+            DROP TABLE IF EXISTS broken;
+            DROP TABLE IF EXISTS contexts;
+            CREATE TABLE broken (
+                seq INTEGER PRIMARY KEY, url TEXT, referrer TEXT, status, final_url TEXT, error TEXT, kind TEXT
+            );
+            CREATE INDEX broken_url ON broken (url);
+            CREATE TABLE contexts (
+                url TEXT, referrer TEXT, data TEXT, PRIMARY KEY (url, referrer)
+            ) WITHOUT ROWID;
+        """)
+        self._writer.commit()
+        self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        self.broken_links = _BrokenLinkMapping(self)
+        self.link_contexts = _LinkContextMapping(self)
+
+    def write(self, sql: str, params: tuple = ()):
+        with self._lock:
+            self._writer.execute(sql, params)
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self._writer.commit()
+                self._uncommitted = 0
+
+    def flush(self):
+        with self._lock:
+            self._writer.commit()
+            self._uncommitted = 0
+
+    def read(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Run a query on the read connection after making pending writes visible to it"""
+        if self._uncommitted:
+            self.flush()
+        return self._reader.execute(sql, params)
+
+    def query_one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """Fetch a single row through the write connection, which sees pending writes without a commit"""
+        with self._lock:
+            return self._writer.execute(sql, params).fetchone()
+
+
+class _RetryScheduler:
+    """Delayed retry queue for link checks that failed transiently"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._heap = []  # (due_time, sequence, url)
+        self._pending = {}  # url -> {'attempt': int, 'referrers': set}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._pending
+
+    def schedule(self, url: str, referrers, attempt: int) -> bool:
+        """
+        Queue a retry with exponential backoff and jitter
+
+        Returns:
+            False if the URL has used up its retries
+        """
+        if url in self._pending:
+            self._pending[url]['referrers'].update(referrers)
+            return True
+        if attempt > self.max_retries:
+            return False
+
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self._sequence += 1
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._sequence, url))
+        self._pending[url] = {'attempt': attempt, 'referrers': set(referrers)}
+        return True
+
+    def pop_due(self):
+        """Yield (url, referrers, attempt) for every retry whose delay has passed"""
+        now = time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, url = heapq.heappop(self._heap)
+            entry = self._pending.pop(url)
+            yield url, entry['referrers'], entry['attempt']
+
+    def seconds_until_next(self) -> Optional[float]:
+        """Time until the next retry is due, or None if nothing is queued"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+
+class HostConcurrencyLimiter:
+    """
+    Adaptive per-host limit on in-flight requests
+
+    Limits follow AIMD: every successful response adds 1/limit (about one
+    slot per round of requests) while the host's short-term latency stays
+    within latency_tolerance of its long-term average, and a timeout, 429 or
+    503, or a connection error halves the limit. Concurrent failures from
+    one burst only back off once. Limits stay between min_limit and
+    max_limit. One limiter can be shared by several agents, so hosts they
+    have in common get a single limit.
+
+    Pool work goes through submit(): tasks over a host's limit wait in a
+    per-host queue rather than on a worker thread, so one slow host cannot
+    tie up the pool. A task holds its host's slot until it returns, and
+    requests it sends to that host run on that slot.
+    """
+
+    def __init__(self, min_limit: int = 1, max_limit: int = 10, initial_limit: int = 2,
+                 latency_tolerance: float = 2.0, backoff: float = 0.5):
+        """
+        Args:
+            min_limit: Lowest per-host limit
+            max_limit: Highest per-host limit
+            initial_limit: Limit a host starts at
+            latency_tolerance: Short-term/long-term latency ratio above which limits stop growing
+            backoff: Factor a limit is multiplied by when the host is overloaded
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.initial_limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.log_interval = 30.0
+        self._hosts = {}
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def _state(self, host: str) -> dict:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'limit': float(self.initial_limit),
+                'in_flight': 0,
+                'short_latency': None,
+                'long_latency': None,
+                'last_decrease': 0.0,
+                'last_logged': 0.0,
+                'queue': deque()  # (executor, future, fn, args) waiting for a slot
+            }
+        return state
+
+    def limits(self) -> Dict[str, int]:
+        """Current limit of every host seen so far"""
+        with self._condition:
+            return {host: int(state['limit']) for host, state in self._hosts.items()}
+
+    def holds(self, host: str) -> bool:
+        """Whether the calling thread is running a task submitted for host, and so already has its slot"""
+        return getattr(self._local, 'host', None) == host
+
+    def acquire(self, host: str):
+        """Wait for a free request slot on a host, for callers outside the worker pool"""
+        with self._condition:
+            state = self._state(host)
+            while state['in_flight'] >= int(state['limit']):
+                self._condition.wait()
+            state['in_flight'] += 1
+
+    def release(self, host: str):
+        """Free a request slot and start the host's queued work"""
+        with self._condition:
+            self._state(host)['in_flight'] -= 1
+            self._condition.notify_all()
+        self._dispatch(host)
+
+    def submit(self, executor: concurrent.futures.Executor, host: str, fn, *args) -> concurrent.futures.Future:
+        """Run fn(*args) on executor once host has a free slot"""
+        future = concurrent.futures.Future()
+        with self._condition:
+            self._state(host)['queue'].append((executor, future, fn, args))
+        self._dispatch(host)
+        return future
+
+    def _dispatch(self, host: str):
+        """Hand queued tasks to their pools while the host has free slots"""
+        with self._condition:
+            state = self._state(host)
+            ready = []
+            while state['queue'] and state['in_flight'] < int(state['limit']):
+                state['in_flight'] += 1
+                ready.append(state['queue'].popleft())
+        for executor, future, fn, args in ready:
+            try:
+                executor.submit(self._run, host, future, fn, args)
+            except RuntimeError as e:
+                # The pool has been shut down
+                future.set_exception(e)
+                self.release(host)
+
+    def _run(self, host: str, future: concurrent.futures.Future, fn, args):
+        """Run a submitted task on its host's slot"""
+        if not future.set_running_or_notify_cancel():
+            self.release(host)
+            return
+        self._local.host = host
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._local.host = None
+            self.release(host)
+
+    def record(self, host: str, latency: float, overloaded: bool = False):
+        """
+        Adjust the host's limit after a response or failure
+
+        Args:
+            host: Host the request went to
+            latency: Seconds until the response headers arrived
+            overloaded: The request timed out, could not connect, or got a 429 or 503
+        """
+        with self._condition:
+            state = self._state(host)
+            old_limit = int(state['limit'])
+            now = time.monotonic()
+            if overloaded:
+                if now - state['last_decrease'] > (state['short_latency'] or latency):
+                    state['limit'] = max(self.min_limit, state['limit'] * self.backoff)
+                    state['last_decrease'] = now
+            else:
+                if state['short_latency'] is None:
+                    state['short_latency'] = state['long_latency'] = latency
+                else:
+                    state['short_latency'] += 0.3 * (latency - state['short_latency'])
+                    state['long_latency'] += 0.05 * (latency - state['long_latency'])
+                if state['short_latency'] <= self.latency_tolerance * state['long_latency']:
+                    state['limit'] = min(self.max_limit, state['limit'] + 1 / state['limit'])
+            new_limit = int(state['limit'])
+            short_latency = state['short_latency'] or latency
+            # Back-offs are logged at most every log_interval seconds per host
+            log_backoff = new_limit < old_limit and now - state['last_logged'] >= self.log_interval
+            if log_backoff:
+                state['last_logged'] = now
+            if new_limit > old_limit:
+                self._condition.notify_all()
+
+        if log_backoff:
+            logger.info(f"Concurrency for {host}: {old_limit} -> {new_limit} "
+                        f"({'overloaded' if overloaded else 'slowing down'}, {short_latency * 1000:.0f} ms)")
+        elif new_limit > old_limit:
+            logger.debug(f"Concurrency for {host}: {old_limit} -> {new_limit} ({short_latency * 1000:.0f} ms)")
+            self._dispatch(host)
+
+
+class DNSCache:
+    """
+    In-process DNS cache for the HTTP connections urllib3 opens
+
+    install() patches urllib3's create_connection, so every new connection
+    resolves its host through the cache, and the last matching uninstall()
+    puts the original back; agents uninstall when they are closed. Answers are kept for their record
+    TTL when the resolver reports one, else for default_ttl, and failures
+    for negative_ttl. Concurrent lookups of one host share a single query,
+    and prefetch() resolves many hosts in parallel ahead of their checks.
+
+    A resolver is any callable taking a host name and returning
+    (addresses, ttl_seconds or None), so tests can pass in a stub.
+    """
+
+    def __init__(self, resolver=None, default_ttl: float = 300, negative_ttl: float = 30,
+                 prefetch_workers: int = 16):
+        """
+        Args:
+            resolver: Lookup callable, system_resolver by default
+            default_ttl: Seconds to keep answers that came without a TTL
+            negative_ttl: Seconds to remember failed lookups
+            prefetch_workers: Parallel lookups run by prefetch()
+        """
+        self.resolver = resolver or self.system_resolver
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.prefetch_workers = prefetch_workers
+        self.lookups = 0
+        self.hits = 0
+        self.failures = 0
+        self.lookup_seconds = 0.0
+        self._entries = {}  # host -> (addresses or exception, expires_at)
+        self._pending = {}  # host -> Future of an in-flight lookup
+        self._lock = threading.Lock()
+        self._original_create_connection = None
+        self._installs = 0
+
+    @staticmethod
+    def system_resolver(host: str) -> Tuple[List[str], Optional[float]]:
+        """Resolve through getaddrinfo, which does not report TTLs"""
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        return list(dict.fromkeys(info[4][0] for info in infos)), None
+
+    @staticmethod
+    def dnspython_resolver(nameservers: List[str] = None, port: int = 53):
+        """
+        Resolver that queries name servers directly and honours record TTLs
+
+        Args:
+            nameservers: Server addresses, the system's configured ones by default
+            port: Server port, e.g. a local stub resolver's
+        """
+        if dns is None:
+            raise RuntimeError("dnspython is required to query a specific DNS server")
+        resolver = dns.resolver.Resolver(configure=not nameservers)
+        if nameservers:
+            resolver.nameservers = nameservers
+            resolver.port = port
+
+        def resolve(host: str) -> Tuple[List[str], Optional[float]]:
+            addresses, ttl = [], None
+            for rdtype in ('A', 'AAAA'):
+                try:
+                    answer = resolver.resolve(host, rdtype)
+                except dns.resolver.NoAnswer:
+                    continue
+                addresses.extend(record.address for record in answer)
+                ttl = answer.rrset.ttl if ttl is None else min(ttl, answer.rrset.ttl)
+            if not addresses:
+                raise socket.gaierror(socket.EAI_NONAME, f"No addresses for {host}")
+            return addresses, ttl
+        return resolve
+
+    def resolve(self, host: str) -> List[str]:
+        """
+        Addresses of a host, from the cache when fresh
+
+        Raises:
+            socket.gaierror: If the host does not resolve
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[1] > now:
+                self.hits += 1
+                if isinstance(entry[0], Exception):
+                    raise entry[0]
+                return entry[0]
+            future = self._pending.get(host)
+            owner = future is None
+            if owner:
+                future = self._pending[host] = concurrent.futures.Future()
+
+        if owner:
+            started = time.monotonic()
+            try:
+                addresses, ttl = self.resolver(host)
+                entry = (addresses, started + (self.default_ttl if ttl is None else ttl))
+                future.set_result(addresses)
+            except Exception as e:
+                error = e if isinstance(e, socket.gaierror) else socket.gaierror(socket.EAI_NONAME, str(e))
+                entry = (error, started + self.negative_ttl)
+                future.set_exception(error)
+            with self._lock:
+                self.lookups += 1
+                self.lookup_seconds += time.monotonic() - started
+                if isinstance(entry[0], Exception):
+                    self.failures += 1
+                self._entries[host] = entry
+                del self._pending[host]
+        return future.result()
+
+    def prefetch(self, hosts, timeout: float = None):
+        """
+        Resolve hosts in parallel, waiting up to timeout seconds for the answers
+
+        Hosts whose lookup is already under way are not waited on again, so a
+        hanging resolver costs the caller at most one timeout per host.
+        """
+        now = time.monotonic()
+        with self._lock:
+            missing = [host for host in set(hosts) if not self._is_literal(host) and host not in self._pending
+                       and not (host in self._entries and self._entries[host][1] > now)]
+        if not missing:
+            return
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.prefetch_workers, len(missing)))
+        try:
+            futures = [pool.submit(self.resolve, host) for host in missing]
+            concurrent.futures.wait(futures, timeout=timeout)
+        finally:
+            # Slow lookups finish in the background and still land in the cache
+            pool.shutdown(wait=False)
+
+    @staticmethod
+    def _is_literal(host: str) -> bool:
+        try:
+            ipaddress.ip_address(host.strip('[]'))
+            return True
+        except ValueError:
+            return host == 'localhost'
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'failures': self.failures,
+                'lookup_seconds': round(self.lookup_seconds, 3),
+                'hosts': len(self._entries)
+            }
+
+    def create_connection(self, address, *args, **kwargs):
+        """Drop-in for urllib3's create_connection that dials cached addresses in turn"""
+        host, port = address
+        if self._is_literal(host):
+            return self._original_create_connection(address, *args, **kwargs)
+        error = None
+        for ip in self.resolve(host):
+            try:
+                return self._original_create_connection((ip, port), *args, **kwargs)
+            except OSError as e:
+                error = e
+        raise error
+
+    def install(self):
+        """Route urllib3's new connections through this cache until every install() has been undone"""
+        with self._lock:
+            self._installs += 1
+            if self._installs == 1:
+                self._original_create_connection = urllib3.util.connection.create_connection
+                urllib3.util.connection.create_connection = self.create_connection
+
+    def uninstall(self):
+        """Undo one install(), restoring urllib3's create_connection after the last"""
+        with self._lock:
+            if not self._installs:
+                return
+            self._installs -= 1
+            if not self._installs and urllib3.util.connection.create_connection == self.create_connection:
+                urllib3.util.connection.create_connection = self._original_create_connection
+
+
+class _ReportChunkWriter:
+    """Streams report rows into numbered script files the report page loads on demand"""
+
+    def __init__(self, data_dir: Path, name: str, chunk_size: int):
+        self.data_dir = data_dir
+        self.name = name
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.chunks = 0
+        self.files = []
+        self._buffer = []
+
+    def add(self, row: dict):
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def close(self):
+        if self._buffer:
+            self._flush()
+
+    def _flush(self):
+        # Script files rather than JSON, since browsers block fetch() on file:// pages
+        chunk_file = self.data_dir / f"{self.name}-{self.chunks:04d}.js"
+        content = f"reportChunk({json.dumps(self.name)}, {self.chunks}, {json.dumps(self._buffer)});\n"
+        # A report rewritten in place only touches the chunks whose rows changed
+        if not (chunk_file.exists() and chunk_file.read_text(encoding='utf-8') == content):
+            chunk_file.write_text(content, encoding='utf-8')
+        self.files.append(chunk_file)
+        self.chunks += 1
+        self._buffer = []
+
+
 class AILinkRepairAgent:
+    # Failure classes that are worth retrying, and how long each failure stays cached
+    TRANSIENT_FAILURES = {'timeout', 'connection', 'server_error', 'rate_limited'}
+    NEGATIVE_CACHE_TTLS = {
+        'timeout': 300,
+        'connection': 300,
+        'server_error': 600,
+        'rate_limited': 600,
+        'not_found': 24 * 3600,
+        'error': 3600,
+    }
+
+    # How links are handled, by the tag they were found in:
+    #   crawl: the link is followed as a page; assets are only checked, never downloaded
+    #   range: fall back to a one-byte Range GET instead of a GET when HEAD is rejected
+    #   immutable: fingerprinted URLs are checked once per run
+    #   sample: may be skipped when asset_sample_rate is below 1
+    # Links only ever seen in other tags use the 'a' policy.
+    CHECK_POLICIES = {
+        'a': {'crawl': True, 'range': False, 'immutable': False, 'sample': False},
+        'iframe': {'crawl': True, 'range': False, 'immutable': False, 'sample': False},
+        'img': {'crawl': False, 'range': True, 'immutable': True, 'sample': True},
+        'source': {'crawl': False, 'range': True, 'immutable': True, 'sample': True},
+        'script': {'crawl': False, 'range': True, 'immutable': True, 'sample': True},
+        'link': {'crawl': False, 'range': True, 'immutable': True, 'sample': True},
+    }
+    # Content hash in the file name or version query, e.g. app.3f9a1c2b.js, main-3f9a1c2b7d.css, logo.png?v=3f9a1c2b
+    FINGERPRINT_PATTERN = re.compile(r'[.\-_][0-9a-fA-F]{8,}\.[A-Za-z0-9]+$|[?&](?:v|ver|hash)=[0-9a-fA-F]{8,}')
+
+    # Stylesheet shared by the full and diff reports
+    REPORT_STYLE = """
+                body { font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }
+                h1, h2 { color: #2c3e50; }
+                .summary { background: #f8f9fa; padding: 15px; border-radius: 5px; }
+                .fix-card { border: 1px solid #ddd; padding: 15px; margin-bottom: 15px; border-radius: 5px; }
+                .automatic { border-left: 4px solid #2ecc71; }
+                .ai { border-left: 4px solid #3498db; }
+                .confidence { display: inline-block; padding: 2px 5px; background: #eee; border-radius: 3px; }
+                .high-confidence { background: #d4edda; }
+                .medium-confidence { background: #fff3cd; }
+                table { width: 100%; border-collapse: collapse; }
+                th, td { padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }
+                tr:hover { background-color: #f5f5f5; }
+                .controls { margin: 10px 0; }
+                .controls input { padding: 5px; width: 300px; margin-right: 10px; }
+                .viewport { position: relative; overflow-y: auto; border: 1px solid #ddd; }
+                .spacer { position: relative; }
+                .vrow { display: grid; height: 34px; align-items: center; border-bottom: 1px solid #ddd; left: 0; right: 0; }
+                .spacer .vrow { position: absolute; }
+                .spacer .vrow:hover { background-color: #f5f5f5; }
+                .vrow > * { padding: 0 8px; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+                .vheader { font-weight: bold; }
+                .sortable { cursor: pointer; }
+    """
+
+    # Client for the paged report: loads data chunks on demand and renders only visible rows
+    REPORT_SCRIPT = """
+(function () {
+    const ROW_HEIGHT = 34;
+    const VIEW_HEIGHT = 600;
+    const COLUMNS = {
+        fixes: [
+            {key: 'broken_url', label: 'Broken URL', width: '3fr', link: true},
+            {key: 'type', label: 'Type', width: '1fr'},
+            {key: 'suggestion', label: 'Suggestion', width: '3fr'},
+            {key: 'confidence', label: 'Confidence', width: '1fr', sortable: true, suffix: '%'},
+            {key: 'impact', label: 'Pages affected', width: '1fr', sortable: true},
+            {key: 'referrer_count', label: 'Referrers', width: '1fr', sortable: true}
+        ],
+        broken: [
+            {key: 'url', label: 'Broken URL', width: '3fr', link: true},
+            {key: 'status', label: 'Status', width: '1fr'},
+            {key: 'referrers', label: 'Found on pages', width: '3fr'},
+            {key: 'referrer_count', label: 'Referrers', width: '1fr', sortable: true},
+            {key: 'impact', label: 'Pages affected', width: '1fr', sortable: true}
+        ],
+        redirects: [
+            {key: 'source', label: 'Original URL', width: '1fr', link: true},
+            {key: 'target', label: 'Redirects To', width: '1fr', link: true}
+        ]
+    };
+    const tables = {};
+
+    window.reportChunk = function (name, index, rows) {
+        const table = tables[name];
+        table.chunks[index] = rows;
+        if (table.waiting[index]) {
+            table.waiting[index]();
+            delete table.waiting[index];
+        }
+    };
+
+    function loadChunk(table, index) {
+        if (table.chunks[index]) {
+            return Promise.resolve();
+        }
+        if (!table.loading[index]) {
+            table.loading[index] = new Promise(function (resolve, reject) {
+                table.waiting[index] = resolve;
+                const script = document.createElement('script');
+                script.src = REPORT.dataDir + '/' + table.name + '-' + String(index).padStart(4, '0') + '.js';
+                script.onerror = reject;
+                document.head.appendChild(script);
+            });
+        }
+        return table.loading[index];
+    }
+
+    function loadAll(table) {
+        const pending = [];
+        for (let i = 0; i < table.info.chunks; i++) {
+            pending.push(loadChunk(table, i));
+        }
+        return Promise.all(pending).then(function () {
+            return [].concat.apply([], table.chunks);
+        });
+    }
+
+    function rowAt(table, position) {
+        const index = table.view ? table.view[position] : position;
+        const chunk = table.chunks[Math.floor(index / REPORT.chunkSize)];
+        return chunk ? chunk[index % REPORT.chunkSize] : null;
+    }
+
+    function cellText(row, column) {
+        const value = row[column.key];
+        if (Array.isArray(value)) {
+            return value.join(', ');
+        }
+        return value === null || value === undefined ? '' : String(value) + (column.suffix || '');
+    }
+
+    function renderRow(table, row, position) {
+        const element = document.createElement('div');
+        element.className = 'vrow';
+        element.style.top = (position * ROW_HEIGHT) + 'px';
+        element.style.gridTemplateColumns = table.template;
+        table.columns.forEach(function (column) {
+            const text = cellText(row, column);
+            const cell = document.createElement(column.link ? 'a' : 'span');
+            if (column.link) {
+                cell.href = text;
+                cell.target = '_blank';
+            }
+            cell.textContent = text;
+            cell.title = text;
+            element.appendChild(cell);
+        });
+        return element;
+    }
+
+    function render(table) {
+        const count = table.view ? table.view.length : table.info.rows;
+        table.spacer.style.height = (count * ROW_HEIGHT) + 'px';
+        const first = Math.floor(table.viewport.scrollTop / ROW_HEIGHT);
+        const last = Math.min(count, first + Math.ceil(VIEW_HEIGHT / ROW_HEIGHT) + 1);
+        const fragment = document.createDocumentFragment();
+        const missing = new Set();
+        for (let position = first; position < last; position++) {
+            const row = rowAt(table, position);
+            if (row) {
+                fragment.appendChild(renderRow(table, row, position));
+            } else {
+                missing.add(Math.floor(position / REPORT.chunkSize));
+            }
+        }
+        table.spacer.replaceChildren(fragment);
+        missing.forEach(function (index) {
+            loadChunk(table, index).then(function () { render(table); });
+        });
+    }
+
+    function updateView(table) {
+        const filter = table.filter.value.trim().toLowerCase();
+        if (!filter && !table.sortKey) {
+            table.view = null;
+            render(table);
+            return;
+        }
+        table.status.textContent = 'Loading...';
+        loadAll(table).then(function (rows) {
+            let view = rows.map(function (row, index) { return index; });
+            if (filter) {
+                view = view.filter(function (index) {
+                    return table.columns.some(function (column) {
+                        return cellText(rows[index], column).toLowerCase().indexOf(filter) !== -1;
+                    });
+                });
+            }
+            if (table.sortKey) {
+                const key = table.sortKey;
+                const direction = table.sortDescending ? -1 : 1;
+                view.sort(function (a, b) { return direction * ((rows[a][key] || 0) - (rows[b][key] || 0)); });
+            }
+            table.view = view;
+            table.status.textContent = view.length + ' of ' + table.info.rows + ' rows';
+            table.viewport.scrollTop = 0;
+            render(table);
+        });
+    }
+
+    function setup(name) {
+        const root = document.getElementById(name);
+        const table = tables[name] = {
+            name: name,
+            info: REPORT.tables[name],
+            columns: COLUMNS[name],
+            chunks: [],
+            loading: [],
+            waiting: {},
+            view: null,
+            sortKey: null,
+            sortDescending: true
+        };
+        table.template = table.columns.map(function (column) { return column.width; }).join(' ');
+
+        const controls = document.createElement('div');
+        controls.className = 'controls';
+        table.filter = document.createElement('input');
+        table.filter.placeholder = 'Filter rows...';
+        table.status = document.createElement('span');
+        table.status.textContent = table.info.rows + ' rows';
+        controls.append(table.filter, table.status);
+
+        const header = document.createElement('div');
+        header.className = 'vrow vheader';
+        header.style.gridTemplateColumns = table.template;
+        table.columns.forEach(function (column) {
+            const cell = document.createElement('span');
+            cell.textContent = column.label + (column.sortable ? ' \\u21c5' : '');
+            if (column.sortable) {
+                cell.className = 'sortable';
+                cell.addEventListener('click', function () {
+                    table.sortDescending = table.sortKey === column.key ? !table.sortDescending : true;
+                    table.sortKey = column.key;
+                    updateView(table);
+                });
+            }
+            header.appendChild(cell);
+        });
+
+        table.viewport = document.createElement('div');
+        table.viewport.className = 'viewport';
+        table.viewport.style.height = Math.min(VIEW_HEIGHT, Math.max(1, table.info.rows) * ROW_HEIGHT + 2) + 'px';
+        table.spacer = document.createElement('div');
+        table.spacer.className = 'spacer';
+        table.viewport.appendChild(table.spacer);
+        root.append(controls, header, table.viewport);
+
+        let timer = null;
+        table.filter.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { updateView(table); }, 250);
+        });
+        table.viewport.addEventListener('scroll', function () {
+            window.requestAnimationFrame(function () { render(table); });
+        });
+        render(table);
+    }
+
+    Object.keys(REPORT.tables).forEach(setup);
+})();
+    """
+
     def __init__(self, base_url: str, openai_api_key: str = None, max_workers: int = 10, 
-                 timeout: int = 10, user_agent: str = None, cache_dir: str = ".ailinkcache"):
+                 timeout: int = 10, user_agent: str = None, cache_dir: str = ".ailinkcache",
+                 max_retries: int = 3, shared_cache: SharedStatusCache = None,
+                 session: requests.Session = None, visited_store: str = None,
+                 max_pages_per_pattern: int = None, results_store: str = None,
+                 asset_sample_rate: float = 1.0, min_host_concurrency: int = 1,
+                 max_host_concurrency: int = None, concurrency_limiter: HostConcurrencyLimiter = None,
+                 archive: HTTPArchive = None, dns_cache: DNSCache = None, http2: bool = False):
         """
         AI-powered dead link detection and repair agent
         
@@ -30,26 +2044,77 @@ class AILinkRepairAgent:
             timeout: Request timeout in seconds
             user_agent: Custom User-Agent string
             cache_dir: Directory to cache results
+            max_retries: Retries for timeouts, connection resets, 5xx and 429 responses
+            shared_cache: Cross-site cache consulted for links to other hosts
+            session: HTTP session to reuse, e.g. one shared by a batch of sites
+            visited_store: SQLite file for a Bloom-filtered on-disk visited set,
+                instead of an in-memory set
+            max_pages_per_pattern: Cap on pages crawled per URL pattern (digits
+                generalized), to escape crawler traps such as calendars
+            results_store: SQLite file that broken links and link contexts are
+                written to during the crawl, instead of keeping them in memory
+            asset_sample_rate: Fraction of asset links (images, scripts,
+                stylesheets, media sources) to check; the same URLs are
+                sampled on every run
+            min_host_concurrency: Lowest adaptive limit on requests in flight per host
+            max_host_concurrency: Highest adaptive limit per host, max_workers by default
+            concurrency_limiter: Limiter to share with other agents; overrides
+                min_host_concurrency and max_host_concurrency
+            archive: HTTPArchive that responses are recorded into, or
+                replayed from without touching the network
+            dns_cache: DNSCache to install until close(); hosts found on
+                each page are pre-resolved before their checks are scheduled
+            http2: Multiplex requests over HTTP/2 with httpx when it is
+                installed; ignored when a session is passed in
         """
+        self.canonicalizer = URLCanonicalizer()
         self.base_url = base_url.rstrip('/')
-        self.domain = urlparse(base_url).netloc
+        self.domain = urlparse(self.normalize_url(base_url)).netloc
         self.scheme = urlparse(base_url).scheme
         self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
         self.max_workers = max_workers
         self.timeout = timeout
+        self.stream_chunk_size = 64 * 1024
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
+        self.body_dir = self.cache_dir / "bodies"
+        self._cache_dirs_ready = False
         
         # Initialize data structures
-        self.visited_urls = set()
-        self.broken_links = defaultdict(list)
+        self.visited_urls = DiskVisitedSet(visited_store) if visited_store else set()
+        self.max_pages_per_pattern = max_pages_per_pattern
+        self.pattern_counts = defaultdict(int)
+        self.results_store = SQLiteResultStore(results_store) if results_store else None
+        self.broken_links = self.results_store.broken_links if self.results_store else defaultdict(list)
         self.redirect_map = {}
         self.url_content_cache = {}
         self.url_structure = defaultdict(set)
-        self.link_contexts = defaultdict(dict)
-        
+        self.link_contexts = self.results_store.link_contexts if self.results_store else defaultdict(dict)
+        self.link_graph = None
+        self.link_impact = {}
+        self.similarity_threshold = 0.5
+        self.link_tags = {}
+        self.immutable_results = {}
+        self.asset_sample_rate = asset_sample_rate
+        self.assets_skipped = 0
+        self.retry_scheduler = _RetryScheduler(max_retries=max_retries)
+
+        self.shared_cache = shared_cache
+        self.external_batch_size = 20
+        self.limiter = concurrency_limiter or HostConcurrencyLimiter(
+            min_limit=min_host_concurrency,
+            max_limit=max_host_concurrency or max_workers
+        )
+        self.archive = archive
+        self.dns_cache = dns_cache
+        if dns_cache is not None:
+            dns_cache.install()
+
         # Configure session
-        self.session = requests.Session()
+        self._session = session
+        self._owns_session = session is None
+        self.http2 = http2
+        self._fix_table = None
+        self.fix_batch_size = 200
         self.headers = {
             'User-Agent': user_agent or 'AILinkRepairAgent/1.0',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
@@ -62,23 +2127,158 @@ class AILinkRepairAgent:
         
         logger.info(f"Initialized AI Link Repair Agent for {self.base_url}")
 
+    @staticmethod
+    def create_session(pool_maxsize: int, http2: bool = False) -> requests.Session:
+        """
+        Create an HTTP session that keeps a connection pool for each of many external hosts
+
+        Args:
+            pool_maxsize: Connections kept per host
+            http2: Return an HTTP2Session over the requests session, if httpx and h2 are installed
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if http2:
+            if HTTP2Session.available():
+                return HTTP2Session(fallback=session)
+            logger.warning("HTTP/2 needs httpx and h2 (pip install 'httpx[http2]'), using HTTP/1.1")
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session, created on first use"""
+        if self._session is None:
+            self._session = self.create_session(self.max_workers, http2=self.http2)
+        return self._session
+
+    def close(self):
+        """Undo the DNS cache patch and close the session the agent created and its fix table"""
+        if self.dns_cache is not None:
+            self.dns_cache.uninstall()
+            self.dns_cache = None
+        if self._session is not None and self._owns_session:
+            self._session.close()
+            self._session = None
+        if self._fix_table is not None:
+            self._fix_table.close()
+            self._fix_table = None
+
+    def reset_crawl(self):
+        """Forget what the last crawl found, so the next one sees only what the site links to now"""
+        self.visited_urls.clear()
+        # Page caps count pages visited, so they start over with the visited set
+        self.pattern_counts.clear()
+        self.broken_links.clear()
+        self.link_contexts.clear()
+        self.url_structure.clear()
+        self.link_tags.clear()
+        self.immutable_results.clear()
+        self.link_graph = None
+        self.link_impact = {}
+        self.assets_skipped = 0
+
+    def _ensure_cache_dirs(self):
+        """Create the cache directories on first write, so runs that only read leave no trace"""
+        if not self._cache_dirs_ready:
+            self.body_dir.mkdir(parents=True, exist_ok=True)
+            self._cache_dirs_ready = True
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the session, within the host's concurrency limit
+
+        headers and timeout default to the agent's own. Tasks started through
+        the limiter already hold their host's slot; other callers wait for
+        one. A streamed response keeps its slot until it is closed. Response
+        times, timeouts, connection errors, 429s and 503s feed the limiter.
+        With a replay archive the recorded response is returned instead, and
+        in record mode every response is read in full and archived.
+        """
+        kwargs.setdefault('headers', self.headers)
+        kwargs.setdefault('timeout', self.timeout)
+        if self.archive is not None:
+            key = self.archive.request_key(method, url, kwargs['headers'])
+            if self.archive.mode == 'replay':
+                return self.archive.replay(key)
+
+        host = urlparse(url).netloc
+        held = self.limiter.holds(host)
+        if not held:
+            self.limiter.acquire(host)
+        release = not held
+        started = time.monotonic()
+        overloaded = False
+        try:
+            response = self.session.request(method, url, **kwargs)
+            overloaded = response.status_code in (429, 503)
+            if self.archive is not None:
+                self.archive.record(key, response)
+            if release and kwargs.get('stream'):
+                self._release_on_close(response, host)
+                release = False
+            return response
+        except requests.RequestException as e:
+            overloaded = isinstance(e, (requests.Timeout, requests.ConnectionError))
+            if self.archive is not None:
+                self.archive.record_error(key, url, e)
+            raise
+        finally:
+            self.limiter.record(host, time.monotonic() - started, overloaded)
+            if release:
+                self.limiter.release(host)
+
+    def _release_on_close(self, response: requests.Response, host: str):
+        """Keep the host's slot while a streamed body is being read, and free it once on close"""
+        close = response.close
+        lock = threading.Lock()
+        released = False
+
+        def close_and_release():
+            nonlocal released
+            try:
+                close()
+            finally:
+                with lock:
+                    release, released = not released, True
+                if release:
+                    self.limiter.release(host)
+
+        response.close = close_and_release
+
     def _get_cache_key(self, url: str) -> str:
         """Generate a cache key for a URL"""
         return hashlib.md5(url.encode('utf-8')).hexdigest()
 
     def _load_from_cache(self, key: str):
-        """Load data from cache"""
+        """Load data from cache, ignoring entries whose TTL has expired or that can't be read"""
         cache_file = self.cache_dir / f"{key}.json"
-        if cache_file.exists():
+        try:
             with open(cache_file, 'r') as f:
-                return json.load(f)
-        return None
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(data, dict) and '_expires_at' in data:
+            if data['_expires_at'] < time.time():
+                return None
+            return data['_data']
+        return data
 
-    def _save_to_cache(self, key: str, data):
-        """Save data to cache"""
+    def _save_to_cache(self, key: str, data, ttl: float = None):
+        """Save data to cache, optionally expiring after ttl seconds"""
+        if ttl is not None:
+            data = {'_expires_at': time.time() + ttl, '_data': data}
+        self._ensure_cache_dirs()
         cache_file = self.cache_dir / f"{key}.json"
-        with open(cache_file, 'w') as f:
-            json.dump(data, f)
+        # Agents sharing a cache_dir never see a half-written entry
+        partial_file = self.cache_dir / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(partial_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(partial_file, cache_file)
+        finally:
+            partial_file.unlink(missing_ok=True)
 
     def is_valid_url(self, url: str) -> bool:
         """Check if URL is valid"""
@@ -90,173 +2290,513 @@ class AILinkRepairAgent:
         return urlparse(url).netloc == self.domain
 
     def normalize_url(self, url: str) -> str:
-        """Normalize URL by removing fragments and queries"""
+        """Normalize URL to its canonical spelling, removing fragments and queries"""
+        return self.canonicalizer.canonicalize(url) or url.rstrip('/')
+
+    @staticmethod
+    def url_pattern(url: str) -> str:
+        """Generalize a URL so trap-like families share one pattern, e.g. /cal/2024/05 -> /cal/{n}/{n}"""
+        parsed = urlparse(url)
+        path = re.sub(r'[0-9a-fA-F]{16,}', '{id}', parsed.path)
+        return parsed.netloc + re.sub(r'\d+', '{n}', path)
+
+    def check_policy(self, url: str) -> dict:
+        """Check policy for a link, based on the tag it was found in"""
+        return self.CHECK_POLICIES.get(self.link_tags.get(url), self.CHECK_POLICIES['a'])
+
+    def is_fingerprinted(self, url: str) -> bool:
+        """Whether a URL carries a content hash, so what it points to never changes"""
         parsed = urlparse(url)
-        return urlunparse(parsed._replace(fragment='', query='')).rstrip('/')
+        return bool(self.FINGERPRINT_PATTERN.search(parsed.path + ('?' + parsed.query if parsed.query else '')))
+
+    def in_asset_sample(self, url: str) -> bool:
+        """Whether an asset link is among the asset_sample_rate fraction that gets checked"""
+        if self.asset_sample_rate >= 1 or not self.check_policy(url)['sample']:
+            return True
+        bucket = int.from_bytes(hashlib.md5(url.encode('utf-8')).digest()[:4], 'big') / 2 ** 32
+        return bucket < self.asset_sample_rate
+
+    def get_absolute_url(self, url: str) -> str:
+        """Convert relative URL to absolute"""
+        return urljoin(self.base_url + '/', url)
+
+    @staticmethod
+    def classify_failure(status, exc: Exception = None) -> Optional[str]:
+        """
+        Classify a failed check
+
+        Returns:
+            One of 'timeout', 'connection', 'server_error', 'rate_limited',
+            'not_found' or 'error', or None if the check succeeded
+        """
+        if exc is not None:
+            if isinstance(exc, requests.Timeout):
+                return 'timeout'
+            if isinstance(exc, requests.ConnectionError):
+                return 'connection'
+            return 'error'
+        if status in (404, 410):
+            return 'not_found'
+        if status == 429:
+            return 'rate_limited'
+        if isinstance(status, int) and status >= 500:
+            return 'server_error'
+        return None
+
+    def check_url(self, url: str, refresh: bool = False) -> Tuple[str, int, Optional[str], Optional[str], Optional[str]]:
+        """
+        Check a URL's status with caching
+
+        Failures are classified with classify_failure and cached only for the
+        class's NEGATIVE_CACHE_TTLS entry, so they get re-checked in later runs.
+        Assets follow their tag's CHECK_POLICIES entry: servers that reject
+        HEAD get a one-byte Range GET, and fingerprinted URLs that checked out
+        are not checked again in the same run.
+
+        Args:
+            url: URL to check
+            refresh: Skip every cache lookup, fingerprinted assets included, e.g. when
+                retrying a transient failure or re-checking on a schedule
+
+        Returns:
+            Tuple of (url, status_code, final_url, error_message, failure_kind),
+            where failure_kind is None for a successful check
+        """
+        policy = self.check_policy(url)
+        if policy['immutable'] and not refresh and url in self.immutable_results:
+            return self.immutable_results[url]
+
+        external = self.shared_cache is not None and not self.is_same_domain(url)
+        if external and not refresh:
+            shared = self.shared_cache.get(url)
+            if shared:
+                return shared
+
+        cache_key = self._get_cache_key(f"check_{url}")
+        cached = None if refresh else self._load_from_cache(cache_key)
+        if cached:
+            if len(cached) > 4:
+                return tuple(cached[:5])
+            # Entries from older versions cached errors forever; only trust successes
+            if cached[1] != 'Error':
+                return tuple(cached) + (self.classify_failure(cached[1]),)
+        
+        try:
+            # Try HEAD first for efficiency
+            response = self._request('HEAD', url, allow_redirects=True)
+            
+            # Fall back to GET if HEAD not allowed
+            if response.status_code in (405, 501):
+                headers = self.headers
+                if policy['range']:
+                    # Ask for the first byte only, so a video or bundle isn't downloaded
+                    headers = {**self.headers, 'Range': 'bytes=0-0'}
+                response = self._request('GET', url, headers=headers, allow_redirects=True, stream=True)
+                response.close()
+                if response.status_code == 416:
+                    # Empty files can't satisfy any range, but they do exist
+                    response.status_code = 200
+            
+            final_url = response.url
+            status = 200 if response.status_code == 206 else response.status_code
+            
+            result = (url, status, final_url, None, self.classify_failure(status))
+            
+        except (requests.RequestException, ArchiveMiss) as e:
+            result = (url, 'Error', None, str(e), self.classify_failure(None, e))
+
+        kind = result[4]
+        if kind is None and policy['immutable'] and self.is_fingerprinted(url):
+            self.immutable_results[url] = result
+        self._save_to_cache(cache_key, result, ttl=self.NEGATIVE_CACHE_TTLS.get(kind))
+        if external:
+            self.shared_cache.put(*result)
+        return result
+
+    def check_urls(self, urls) -> list:
+        """Check URLs one after another, so URLs on the same host share a kept-alive connection"""
+        return [self.check_url(url) for url in urls]
+
+    def _new_compressor(self):
+        """Return (codec_name, streaming compressor) for page bodies"""
+        if zstandard is not None:
+            return 'zstd', zstandard.ZstdCompressor(level=3).compressobj()
+        return 'zlib', zlib.compressobj(6)
+
+    def _store_body(self, partial_file: Path, digest: str, codec: str):
+        """Move a compressed body into the content-addressed store, keeping the existing copy if any"""
+        body_file = self.body_dir / f"{digest}.{codec}"
+        if body_file.exists():
+            partial_file.unlink()
+        else:
+            partial_file.replace(body_file)
+
+    def _load_body(self, pointer: dict) -> Optional[str]:
+        """Read and decode a page body referenced by a URL -> hash pointer"""
+        body_file = self.body_dir / f"{pointer['body']}.{pointer['codec']}"
+        if not body_file.exists():
+            return None
+        data = body_file.read_bytes()
+        if pointer['codec'] == 'zstd':
+            if zstandard is None:
+                return None
+            raw = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        else:
+            raw = zlib.decompress(data)
+        return raw.decode(pointer.get('encoding') or 'utf-8', errors='replace')
+
+    def _load_cached_content(self, url: str):
+        """
+        Look up a page in the content cache
+
+        Returns:
+            A URL -> hash pointer dict, a plain string for entries written by
+            older versions, or None
+        """
+        return self._load_from_cache(self._get_cache_key(f"content_{url}"))
+
+    def fetch_page_content(self, url: str) -> Optional[str]:
+        """Fetch and cache page content"""
+        cached = self._load_cached_content(url)
+        if isinstance(cached, dict):
+            content = self._load_body(cached)
+            if content is not None:
+                return content
+        elif cached:
+            return cached
+        
+        try:
+            response = self._request('GET', url, allow_redirects=True)
+            
+            if response.status_code == 200:
+                raw = response.content
+                codec, compressor = self._new_compressor()
+                digest = hashlib.sha256(raw).hexdigest()
+                self._ensure_cache_dirs()
+                partial_file = self.body_dir / f"{digest}.part"
+                partial_file.write_bytes(compressor.compress(raw) + compressor.flush())
+                self._store_body(partial_file, digest, codec)
+                self._save_to_cache(self._get_cache_key(f"content_{url}"), {
+                    'body': digest, 'codec': codec, 'encoding': response.encoding, 'final_url': response.url
+                })
+                return response.text
+            return None
+            
+        except (requests.RequestException, ArchiveMiss):
+            return None
+
+    def analyze_page_structure(self, url: str, content: str):
+        """
+        Analyze page structure and extract semantic information
+
+        Headings, title and section previews are collected in one pass over the
+        document, with each section's text capped at its preview length.
+        """
+        parser = _LinkStreamParser()
+        parser.feed(content)
+        parser.close()
+
+        # Store in structure cache
+        self.url_structure[url] = {
+            'headings': parser.headings,
+            'sections': parser.sections,
+            'title': parser.title
+        }
+
+    def _resolve_href(self, href: str, base: str) -> Optional[str]:
+        """
+        Turn a raw href into a normalized absolute URL, or None if it should be skipped
+
+        Args:
+            href: href as written on the page
+            base: URL the page was served from, as is; canonicalizing it would
+                drop the trailing slash that relative hrefs on directory pages need
+        """
+        # Skip special URLs
+        if href.startswith(('mailto:', 'tel:', 'javascript:', '#', 'data:')):
+            return None
+
+        # Resolution, normalization and validation in one memoized step
+        return self.canonicalizer.canonicalize(href, base)
+
+    def _stream_page(self, url: str, parser: _LinkStreamParser, on_response=None) -> Optional[dict]:
+        """
+        Download a page in chunks, feeding the parser and the body store as data arrives
+
+        Args:
+            url: Page to download
+            parser: Parser the body is fed to
+            on_response: Called with the response once it is known to be a 200,
+                before any of the body is parsed
+
+        Returns:
+            The URL -> hash pointer stored for the page, or None if it could not be fetched
+        """
+        codec, compressor = self._new_compressor()
+        self._ensure_cache_dirs()
+        partial_file = self.body_dir / f"{self._get_cache_key(url)}.{os.getpid()}.part"
+        try:
+            response = self._request('GET', url, allow_redirects=True, stream=True)
+            with response:
+                if response.status_code != 200:
+                    return None
+                if on_response:
+                    on_response(response)
+
+                encoding = response.encoding or 'utf-8'
+                try:
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                except LookupError:
+                    encoding = 'utf-8'
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+                # Bodies are hashed and compressed on the fly, never held whole in memory
+                hasher = hashlib.sha256()
+                with open(partial_file, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.stream_chunk_size):
+                        hasher.update(chunk)
+                        f.write(compressor.compress(chunk))
+                        text = decoder.decode(chunk)
+                        if text:
+                            parser.feed(text)
+                    f.write(compressor.flush())
+                    text = decoder.decode(b'', final=True)
+                    if text:
+                        parser.feed(text)
+
+            pointer = {'body': hasher.hexdigest(), 'codec': codec, 'encoding': encoding, 'final_url': response.url}
+            self._store_body(partial_file, pointer['body'], codec)
+            self._save_to_cache(self._get_cache_key(f"content_{url}"), pointer)
+            return pointer
+
+        except (requests.RequestException, ArchiveMiss):
+            return None
+        finally:
+            # Already moved into the store on success; left over from any kind of failure
+            partial_file.unlink(missing_ok=True)
+
+    def find_links(self, url: str, on_link=None, refresh: bool = False) -> set:
+        """
+        Find all links on a page with context
+
+        The page is parsed incrementally while it downloads. on_link, if given,
+        is called with each newly discovered URL as soon as its tag is parsed.
+        Parse results are cached by body hash, so cached or duplicate bodies
+        are not parsed again. With refresh, the page is downloaded again
+        instead of being read from the page cache. Relative hrefs resolve
+        against the URL the page was served from, after redirects.
+        """
+        links = set()
+        hrefs = []
+        contexts = []
+        base = url
+
+        def discover(href, tag_name='a'):
+            hrefs.append([href, tag_name])
+            link = self._resolve_href(href, base)
+            if link and (tag_name == 'a' or link not in self.link_tags):
+                # A link that is also used as a page keeps the page policy
+                self.link_tags[link] = tag_name
+            if link and link not in links:
+                links.add(link)
+                if on_link:
+                    on_link(link)
+
+        def record_context(href, tag_name, anchor_text, surrounding_text):
+            contexts.append([href, tag_name, anchor_text, surrounding_text])
+            link = self._resolve_href(href, base)
+            if link:
+                # Store link context for AI analysis
+                self.link_contexts[link][url] = {
+                    'anchor_text': anchor_text,
+                    'tag_name': tag_name,
+                    'surrounding_text': surrounding_text,
+                    'position': len(self.link_contexts[link])  # Order on page
+                }
+
+        cached = None if refresh else self._load_cached_content(url)
+        parsed = None
+        if isinstance(cached, dict):
+            # Pointers stored before final URLs were recorded fall back to the page URL
+            base = cached.get('final_url') or url
+            parsed = self._load_from_cache(f"parsed_{cached['body']}")
+
+        if parsed:
+            for entry in parsed['hrefs']:
+                # Entries cached before tags were stored are plain hrefs
+                if isinstance(entry, str):
+                    discover(entry)
+                else:
+                    discover(*entry)
+            for context in parsed['contexts']:
+                record_context(*context)
+            structure = parsed['structure']
+        else:
+            parser = _LinkStreamParser(on_link=discover, on_context=record_context)
+            content = self._load_body(cached) if isinstance(cached, dict) else cached
+            if content:
+                parser.feed(content)
+                pointer = cached if isinstance(cached, dict) else None
+            else:
+                def use_final_url(response):
+                    nonlocal base
+                    base = response.url
+
+                pointer = self._stream_page(url, parser, on_response=use_final_url)
+                if pointer is None:
+                    return set()
+            parser.close()
+
+            structure = {
+                'headings': parser.headings,
+                'sections': parser.sections,
+                'title': parser.title
+            }
+            if pointer is not None:
+                self._save_to_cache(f"parsed_{pointer['body']}", {
+                    'hrefs': hrefs, 'contexts': contexts, 'structure': structure
+                })
+
+        self.url_structure[url] = structure
+        return links
+
+    def _handle_check_result(self, result: tuple, referrers, attempt: int = 0):
+        """
+        Record a finished check, or queue it for retry if it failed transiently
+
+        Every classified failure counts as broken, including 5xx and 429
+        responses that are still failing after the last retry.
+        """
+        url, status, final_url, error, kind = result
+        if kind in self.TRANSIENT_FAILURES:
+            if self.retry_scheduler.schedule(url, referrers, attempt + 1):
+                return
+            logger.warning(f"Giving up on {url} after {attempt} retries: {error or status}")
+
+        if kind is not None:
+            for referrer in referrers:
+                self.broken_links[url].append({
+                    'referrer': referrer,
+                    'status': status,
+                    'final_url': final_url,
+                    'error': error,
+                    'kind': kind
+                })
+
+    def _process_retries(self, executor, retry_futures: dict, block: bool = False):
+        """
+        Submit retries that are due and record the ones that have finished
+
+        Args:
+            executor: Pool the retry checks run on
+            retry_futures: In-flight retries, future -> (referrers, attempt)
+            block: Wait for the next retry to finish or fall due instead of returning immediately
+        """
+        for url, referrers, attempt in self.retry_scheduler.pop_due():
+            logger.info(f"Retrying {url} (attempt {attempt})")
+            future = self.limiter.submit(executor, urlparse(url).netloc, self.check_url, url, True)
+            retry_futures[future] = (referrers, attempt)
 
-    def get_absolute_url(self, url: str) -> str:
-        """Convert relative URL to absolute"""
-        return urljoin(self.base_url + '/', url)
+        done = [future for future in retry_futures if future.done()]
+        if block and not done:
+            wait_time = self.retry_scheduler.seconds_until_next()
+            if retry_futures:
+                done, _ = concurrent.futures.wait(
+                    list(retry_futures), timeout=wait_time,
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            elif wait_time is not None:
+                time.sleep(wait_time)
 
-    def check_url(self, url: str) -> Tuple[str, int, Optional[str], Optional[str]]:
+        for future in done:
+            referrers, attempt = retry_futures.pop(future)
+            self._handle_check_result(future.result(), referrers, attempt)
+
+    def crawl_site(self, start_url: str = None, executor: concurrent.futures.Executor = None,
+                   refresh: bool = False):
         """
-        Check a URL's status with caching
-        
-        Returns:
-            Tuple of (url, status_code, final_url, error_message)
+        Crawl the website and analyze links
+
+        Args:
+            start_url: Page to start from, defaults to the base URL
+            executor: Worker pool for link checks; one sized by max_workers is created if not given
+            refresh: Download every page again rather than reading it from the page cache
         """
-        cache_key = self._get_cache_key(f"check_{url}")
-        cached = self._load_from_cache(cache_key)
-        if cached:
-            return tuple(cached)
+        if executor is None:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return self.crawl_site(start_url, executor, refresh)
+
+        start_url = start_url or self.base_url
+        queue = {self.normalize_url(start_url)}
+        retry_futures = {}
         
-        try:
-            # Try HEAD first for efficiency
-            response = self.session.head(
-                url, 
-                headers=self.headers, 
-                timeout=self.timeout, 
-                allow_redirects=True
-            )
-            
-            # Fall back to GET if HEAD not allowed
-            if response.status_code == 405:
-                response = self.session.get(
-                    url,
-                    headers=self.headers,
-                    timeout=self.timeout,
-                    allow_redirects=True,
-                    stream=True
-                )
-            
-            final_url = response.url
-            status = response.status_code
+        while queue or self.retry_scheduler or retry_futures:
+            # Transient failures are retried in the background without holding up the crawl
+            self._process_retries(executor, retry_futures, block=not queue)
+            if not queue:
+                continue
+
+            current_url = queue.pop()
             
-            result = (url, status, final_url, None)
-            self._save_to_cache(cache_key, result)
-            return result
+            if current_url in self.visited_urls:
+                continue
+                
+            self.visited_urls.add(current_url)
             
-        except requests.RequestException as e:
-            result = (url, 'Error', None, str(e))
-            self._save_to_cache(cache_key, result)
-            return result
+            if not self.is_same_domain(current_url):
+                continue
 
-    def fetch_page_content(self, url: str) -> Optional[str]:
-        """Fetch and cache page content"""
-        cache_key = self._get_cache_key(f"content_{url}")
-        cached = self._load_from_cache(cache_key)
-        if cached:
-            return cached
-        
-        try:
-            response = self.session.get(
-                url,
-                headers=self.headers,
-                timeout=self.timeout,
-                allow_redirects=True
-            )
+            if self.max_pages_per_pattern:
+                pattern = self.url_pattern(current_url)
+                self.pattern_counts[pattern] += 1
+                if self.pattern_counts[pattern] > self.max_pages_per_pattern:
+                    if self.pattern_counts[pattern] == self.max_pages_per_pattern + 1:
+                        logger.warning(f"Page limit reached for {pattern}, skipping further matches")
+                    continue
             
-            if response.status_code == 200:
-                content = response.text
-                self._save_to_cache(cache_key, content)
-                return content
-            return None
+            logger.info(f"Crawling: {current_url}")
             
-        except requests.RequestException:
-            return None
+            # Links enter the frontier and get checked while the page is still downloading.
+            # External links are batched per host once the page is parsed.
+            futures = []
+            external_by_host = defaultdict(list)
 
-    def analyze_page_structure(self, url: str, content: str):
-        """Analyze page structure and extract semantic information"""
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Extract headings hierarchy
-        headings = [tag.text.strip() for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
-        
-        # Extract main content sections
-        sections = {}
-        for section in soup.find_all(['article', 'section', 'main', 'div']):
-            if 'id' in section.attrs:
-                sections[section['id']] = section.text.strip()[:200] + "..."  # Store preview
-        
-        # Store in structure cache
-        self.url_structure[url] = {
-            'headings': headings,
-            'sections': sections,
-            'title': soup.title.text if soup.title else None
-        }
+            def on_link(link):
+                if self.check_policy(link)['crawl'] and link not in self.visited_urls:
+                    queue.add(link)
+                if not self.in_asset_sample(link):
+                    self.assets_skipped += 1
+                elif self.is_same_domain(link):
+                    futures.append(self.limiter.submit(executor, urlparse(link).netloc, self.check_urls, [link]))
+                else:
+                    external_by_host[urlparse(link).netloc].append(link)
 
-    def find_links(self, url: str) -> set:
-        """Find all links on a page with context"""
-        content = self.fetch_page_content(url)
-        if not content:
-            return set()
+            self.find_links(current_url, on_link=on_link, refresh=refresh)
+
+            if self.dns_cache is not None and external_by_host:
+                self.dns_cache.prefetch([urlparse(link).hostname for links in external_by_host.values()
+                                         for link in links[:1]], timeout=self.timeout)
+
+            for host, host_links in external_by_host.items():
+                for i in range(0, len(host_links), self.external_batch_size):
+                    futures.append(self.limiter.submit(executor, host, self.check_urls,
+                                                       host_links[i:i + self.external_batch_size]))
             
-        self.analyze_page_structure(url, content)
-        soup = BeautifulSoup(content, 'html.parser')
-        links = set()
-        
-        for tag in soup.find_all(['a', 'img', 'link', 'script', 'iframe', 'source']):
-            href = tag.get('href') or tag.get('src') or tag.get('data-src')
-            if href:
-                # Skip special URLs
-                if href.startswith(('mailto:', 'tel:', 'javascript:', '#', 'data:')):
-                    continue
-                
-                absolute_url = self.get_absolute_url(href)
-                normalized_url = self.normalize_url(absolute_url)
-                
-                if self.is_valid_url(normalized_url):
-                    links.add(normalized_url)
-                    # Store link context for AI analysis
-                    self.link_contexts[normalized_url][url] = {
-                        'anchor_text': tag.text.strip() if hasattr(tag, 'text') else None,
-                        'tag_name': tag.name,
-                        'surrounding_text': ' '.join(tag.find_parent().get_text().strip().split()[:20]),
-                        'position': len(self.link_contexts[normalized_url])  # Order on page
-                    }
-        
-        return links
+            for future in concurrent.futures.as_completed(futures):
+                for result in future.result():
+                    self._handle_check_result(result, [current_url])
 
-    def crawl_site(self, start_url: str = None):
-        """Crawl the website and analyze links"""
-        start_url = start_url or self.base_url
-        queue = {self.normalize_url(start_url)}
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            while queue:
-                current_url = queue.pop()
-                
-                if current_url in self.visited_urls:
-                    continue
-                    
-                self.visited_urls.add(current_url)
-                
-                if not self.is_same_domain(current_url):
-                    continue
-                
-                logger.info(f"Crawling: {current_url}")
-                
-                # Find all links on the page
-                page_links = self.find_links(current_url)
-                new_links = page_links - set(self.link_contexts.keys())
-                
-                # Add new links to queue
-                queue.update(new_links)
-                
-                # Check all links on the page
-                futures = []
-                for link in page_links:
-                    futures.append(executor.submit(self.check_url, link))
-                
-                for future in concurrent.futures.as_completed(futures):
-                    url, status, final_url, error = future.result()
-                    if status == 404 or isinstance(status, str):
-                        self.broken_links[url].append({
-                            'referrer': current_url,
-                            'status': status,
-                            'final_url': final_url,
-                            'error': error
-                        })
+        limits = self.limiter.limits()
+        if limits:
+            busiest = sorted(limits.items(), key=lambda item: item[1], reverse=True)[:10]
+            logger.info("Per-host concurrency limits: " + ", ".join(f"{host}={limit}" for host, limit in busiest))
+        if self.dns_cache is not None:
+            stats = self.dns_cache.stats()
+            logger.info(f"DNS: {stats['lookups']} lookups ({stats['failures']} failed, "
+                        f"{stats['lookup_seconds']:.1f}s total), {stats['hits']} cache hits")
+        if self.assets_skipped:
+            logger.info(f"Skipped {self.assets_skipped} asset links outside the "
+                        f"{self.asset_sample_rate:.0%} sample")
 
     def get_ai_suggestion(self, broken_url: str, context: dict) -> Optional[dict]:
         """Get AI-powered suggestion for fixing a broken link"""
@@ -267,6 +2807,10 @@ class AILinkRepairAgent:
         cached = self._load_from_cache(cache_key)
         if cached:
             return cached
+
+        # Only AI runs pay for importing these
+        from bs4 import BeautifulSoup
+        import openai
             
         try:
             # Prepare context information
@@ -328,123 +2872,348 @@ class AILinkRepairAgent:
             logger.error(f"AI suggestion failed: {str(e)}")
             return None
 
+    @staticmethod
+    def _url_words(url: str) -> str:
+        """Words from a URL's path, e.g. '/docs/install-guide.html' -> 'docs install guide html'"""
+        return re.sub(r'[/_.\-]+', ' ', urlparse(url).path).strip()
+
+    def _page_text(self, url: str) -> str:
+        """Title, headings, section previews and path words of a crawled page"""
+        structure = self.url_structure.get(url) or {}
+        parts = [structure.get('title') or '', self._url_words(url)]
+        parts.extend(structure.get('headings', []))
+        parts.extend(structure.get('sections', {}).values())
+        return ' '.join(parts)
+
+    def _link_text(self, url: str) -> str:
+        """Path words plus anchor and surrounding text of every occurrence of a link"""
+        parts = [self._url_words(url)]
+        for context in self.link_contexts.get(url, {}).values():
+            parts.append(context.get('anchor_text') or '')
+            parts.append(context.get('surrounding_text') or '')
+        return ' '.join(parts)
+
+    def suggest_similar_pages(self, k: int = 3, urls: List[str] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Match every broken link's text, or that of urls, against crawled page content in one batch
+
+        Returns:
+            Broken URL -> [(page URL, similarity)] best first; empty without NumPy
+        """
+        if np is None or not self.broken_links:
+            return {}
+        pages = [url for url, structure in self.url_structure.items()
+                 if url not in self.broken_links and structure
+                 and (structure.get('title') or structure.get('headings') or structure.get('sections'))]
+        if not pages:
+            return {}
+
+        broken = list(self.broken_links) if urls is None else list(urls)
+        engine = SimilarityEngine().fit([self._page_text(url) for url in pages])
+        # Extra candidates make up for dropping the pages the link was found on,
+        # which always resemble its surrounding text
+        matches = engine.query([self._link_text(url) for url in broken], k + 5)
+        similar = {}
+        for url, row in zip(broken, matches):
+            referrers = self.link_contexts.get(url, {})
+            similar[url] = [(pages[index], score) for index, score in row if pages[index] not in referrers][:k]
+        return similar
+
+    @property
+    def fix_table(self) -> FixTable:
+        """Persistent table of verified fixes in the cache directory, opened on first use"""
+        if self._fix_table is None:
+            self._ensure_cache_dirs()
+            self._fix_table = FixTable(self.cache_dir / "fixes.sqlite3")
+        return self._fix_table
+
+    def _fix_context(self, broken_url: str) -> dict:
+        """Referrer -> link context of every occurrence of a broken link, for the AI prompt"""
+        return {
+            'occurrences': {occ['referrer']: self.link_contexts[broken_url].get(occ['referrer'], {})
+                            for occ in self.broken_links[broken_url]}
+        }
+
+    def _propose_fixes(self, broken_url: str, similar: list) -> List[dict]:
+        """
+        Heuristic fixes for a broken link, before their URLs are checked
+
+        Each fix lists its replacement candidates in 'possible_correct_urls'.
+        """
+        fixes = []
+
+        # Check if this is a redirected URL
+        if broken_url in self.redirect_map:
+            target = self.redirect_map[broken_url]
+            fixes.append({
+                'type': 'redirect_chain',
+                'suggestion': "Update to point directly to: {url}",
+                'confidence': 90,
+                'possible_correct_urls': [target],
+                'source': 'automatic'
+            })
+
+        # Try common technical fixes
+        parsed = urlparse(broken_url)
+        path_parts = parsed.path.split('/')
+        filename = path_parts[-1] if path_parts else ''
+
+        # Case sensitivity fixes
+        lowercase_path = parsed.path.lower()
+        if lowercase_path != parsed.path:
+            fixes.append({
+                'type': 'case_sensitivity',
+                'suggestion': "Update case to: {url}",
+                'confidence': 85,
+                'possible_correct_urls': [urlunparse(parsed._replace(path=lowercase_path))],
+                'source': 'automatic'
+            })
+
+        # Missing extension fixes
+        common_extensions = ['.html', '.htm', '.php', '.aspx', '']
+        fixes.append({
+            'type': 'missing_extension',
+            'suggestion': "Add extension: {url}",
+            'confidence': 80,
+            'possible_correct_urls': [urlunparse(parsed._replace(path=parsed.path + ext))
+                                      for ext in common_extensions if not filename.endswith(ext)],
+            'source': 'automatic'
+        })
+
+        # Pages whose content matches the link's anchor and surrounding text
+        matches = [(page, score) for page, score in similar if score >= self.similarity_threshold]
+        if matches:
+            fixes.append({
+                'type': 'similar_content',
+                'suggestion': "Point to similar page: {url}",
+                'confidence': min(75, round(matches[0][1] * 100)),
+                'possible_correct_urls': [page for page, _ in matches],
+                'source': 'automatic'
+            })
+        return fixes
+
+    def _propose_ai_fix(self, broken_url: str, ai_suggestion: Optional[dict]) -> Optional[dict]:
+        """The model's fix for a broken link, with its URLs resolved, if it is confident enough"""
+        if not ai_suggestion or ai_suggestion.get('confidence', 0) <= 70:
+            return None
+        candidates = [self.canonicalizer.canonicalize(candidate, broken_url)
+                      for candidate in ai_suggestion.get('possible_correct_urls', [])
+                      if isinstance(candidate, str)]
+        return {
+            'type': 'ai_suggestion',
+            'suggestion': ai_suggestion['recommended_fix'],
+            'confidence': ai_suggestion['confidence'],
+            'possible_correct_urls': [candidate for candidate in candidates if candidate],
+            'source': 'ai'
+        }
+
+    def _check_candidates(self, executor: concurrent.futures.Executor, urls, refresh: bool = False) -> Dict[str, tuple]:
+        """
+        Check candidate URLs concurrently; external ones go through the shared status cache
+
+        With refresh, every URL is requested again instead of being answered from a cache.
+        """
+        futures = [self.limiter.submit(executor, urlparse(url).netloc, self.check_url, url, refresh)
+                   for url in set(urls)]
+        return {result[0]: result for result in (future.result() for future in futures)}
+
+    @staticmethod
+    def _rank_candidates(broken_url: str, candidates: List[str], results: Dict[str, tuple]) -> List[str]:
+        """
+        Live candidates, best first
+
+        Candidates answering 200 directly come before ones reached through a
+        redirect, and each group is ordered by how closely the URL resembles
+        the broken one.
+        """
+        ranked = []
+        for candidate in dict.fromkeys(candidates):
+            _, status, final_url, _, _ = results[candidate]
+            if status != 200 or candidate == broken_url:
+                continue
+            similarity = difflib.SequenceMatcher(None, broken_url, candidate).ratio()
+            ranked.append((final_url not in (None, candidate), -similarity, candidate))
+        return [candidate for _, _, candidate in sorted(ranked)]
+
+    def _verify_fixes(self, executor: concurrent.futures.Executor, proposals: Dict[str, list]) -> Dict[str, list]:
+        """
+        Check every candidate of the proposed fixes at once and keep the fixes with live replacements
+
+        A live case fix makes the remaining fixes for that link moot, as the
+        case fix is the link's own target.
+        """
+        results = self._check_candidates(executor, [candidate for fixes in proposals.values()
+                                                    for fix in fixes for candidate in fix['possible_correct_urls']])
+        verified = {}
+        for url, fixes in proposals.items():
+            verified[url] = []
+            for fix in fixes:
+                live = self._rank_candidates(url, fix['possible_correct_urls'], results)
+                if fix['source'] == 'ai':
+                    if not live:
+                        # The model's advice may still help, but none of its URLs work
+                        fix['confidence'] = min(fix['confidence'], 50)
+                        fix['suggestion'] += " (none of the proposed URLs are live)"
+                elif live:
+                    fix['suggestion'] = fix['suggestion'].format(url=live[0])
+                else:
+                    continue
+                fix['possible_correct_urls'] = live
+                verified[url].append(fix)
+                if fix['type'] == 'case_sensitivity':
+                    break
+        return verified
+
+    def _fix_batch(self, executor: concurrent.futures.Executor, batch: List[str], similar: dict) -> Dict[str, list]:
+        """Verified fixes for a batch of broken links, reusing the fix table where it still holds"""
+        verified = {}
+        stored = {url: entry for url in batch if (entry := self.fix_table.get(url))}
+        # Cached successes can outlive the replacement, so stored fixes are checked live
+        results = self._check_candidates(executor, [candidate for _, fixes in stored.values()
+                                                    for fix in fixes for candidate in fix['possible_correct_urls']],
+                                         refresh=True)
+        pending = []
+        for url in batch:
+            if url in stored and results[stored[url][0]][1] == 200:
+                # Fixes stay as long as the replacement their suggestion names is live
+                verified[url] = []
+                for fix in stored[url][1]:
+                    live = [candidate for candidate in fix['possible_correct_urls'] if results[candidate][1] == 200]
+                    if live and live[0] == fix['possible_correct_urls'][0]:
+                        verified[url].append(dict(fix, possible_correct_urls=live))
+            else:
+                if url in stored:
+                    self.fix_table.delete(url)
+                pending.append(url)
+
+        # Heuristic candidates are checked first, so the model is only asked about links
+        # no case fix resolves. Candidate checks and model queries each run concurrently.
+        proposals = {url: self._propose_fixes(url, similar.get(url, [])) for url in pending}
+        for url, fixes in self._verify_fixes(executor, proposals).items():
+            verified[url] = fixes
+        unresolved = [url for url in pending if not any(fix['type'] == 'case_sensitivity' for fix in verified[url])]
+        if self.ai_enabled and unresolved:
+            futures = {url: executor.submit(self.get_ai_suggestion, url, self._fix_context(url)) for url in unresolved}
+            proposals = {url: [fix] for url, future in futures.items()
+                         if (fix := self._propose_ai_fix(url, future.result()))}
+            for url, fixes in self._verify_fixes(executor, proposals).items():
+                verified[url].extend(fixes)
+
+        for url in pending:
+            best = max((fix for fix in verified[url] if fix['possible_correct_urls']),
+                       key=lambda fix: fix['confidence'], default=None)
+            if best:
+                self.fix_table.put(url, best['possible_correct_urls'][0],
+                                   [fix for fix in verified[url] if fix['possible_correct_urls']])
+        return verified
+
     def suggest_fixes(self):
-        """Generate intelligent fixes for broken links"""
+        """
+        Generate intelligent fixes for broken links
+
+        Heuristic and AI candidates are checked concurrently, in batches of
+        fix_batch_size broken links, and only live replacements are suggested,
+        best first. Fixes that checked out are kept in the fix table, so
+        later runs only re-check them.
+        """
         logger.info("Generating fixes for broken links...")
         
-        # First pass: Standard technical fixes
-        for broken_url, occurrences in self.broken_links.items():
-            context = {
-                'occurrences': {occ['referrer']: self.link_contexts[broken_url].get(occ['referrer'], {}) 
-                for occ in occurrences
-            }
-            
-            # Check if this is a redirected URL
-            if broken_url in self.redirect_map:
-                target = self.redirect_map[broken_url]
-                if target not in self.broken_links:
-                    yield {
-                        'broken_url': broken_url,
-                        'type': 'redirect_chain',
-                        'suggestion': f"Update to point directly to: {target}",
-                        'confidence': 90,
-                        'source': 'automatic'
-                    }
-            else:
-                    # Handle cases where the target is in broken_links
-                    logger.warning(f"Target {target} is also a broken link.")
-            else:
-                # Add an appropriate else block or handle the case where the condition is not met
-                logger.info(f"No redirect mapping found for {broken_url}.")
-            
-            # Try common technical fixes
-            parsed = urlparse(broken_url)
-            path_parts = parsed.path.split('/')
-            filename = path_parts[-1] if path_parts else ''
-            
-            # Case sensitivity fixes
-            lowercase_path = parsed.path.lower()
-            if lowercase_path != parsed.path:
-                test_url = urlunparse(parsed._replace(path=lowercase_path))
-                if self.check_url(test_url)[1] == 200:
-                    yield {
-                        'broken_url': broken_url,
-                        'type': 'case_sensitivity',
-                        'suggestion': f"Update case to: {test_url}",
-                        'confidence': 85,
-                        'source': 'automatic'
-                    }
-                    continue
-            
-            # Missing extension fixes
-            common_extensions = ['.html', '.htm', '.php', '.aspx', '']
-            for ext in common_extensions:
-                if not filename.endswith(ext):
-                    test_url = urlunparse(parsed._replace(path=parsed.path + ext))
-                    if self.check_url(test_url)[1] == 200:
-                        yield {
-                            'broken_url': broken_url,
-                            'type': 'missing_extension',
-                            'suggestion': f"Add extension: {test_url}",
-                            'confidence': 80,
-                            'source': 'automatic'
-                        }
-                        break
-            
-            # AI-powered suggestions
-            if self.ai_enabled:
-                ai_suggestion = self.get_ai_suggestion(broken_url, context)
-                if ai_suggestion and ai_suggestion.get('confidence', 0) > 70:
-                    yield {
-                        'broken_url': broken_url,
-                        'type': 'ai_suggestion',
-                        'suggestion': ai_suggestion['recommended_fix'],
-                        'confidence': ai_suggestion['confidence'],
-                        'possible_correct_urls': ai_suggestion.get('possible_correct_urls', []),
-                        'source': 'ai'
-                    }
-
-    def generate_report(self, output_file: str = 'link_repair_report.html'):
-        """Generate an interactive HTML report"""
+        # Work through the broken links that affect the most pages first
+        self.link_graph = LinkGraph.from_link_contexts(self.link_contexts)
+        impact = self.link_impact = self.link_graph.broken_link_impact(self.broken_links)
+        similar = self.suggest_similar_pages()
+        ordered = sorted(impact, key=impact.get, reverse=True)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(ordered), self.fix_batch_size):
+                batch = ordered[start:start + self.fix_batch_size]
+                verified = self._fix_batch(executor, batch, similar)
+                for broken_url in batch:
+                    for fix in verified[broken_url]:
+                        yield dict(fix, broken_url=broken_url, impact=impact[broken_url])
+
+    def generate_report(self, output_file: str = 'link_repair_report.html', chunk_size: int = 1000):
+        """
+        Generate an interactive HTML report
+
+        Rows are streamed into chunked data files in <report name>_data next to
+        a small HTML page that loads, filters and sorts them on demand, so the
+        report opens instantly however many rows it has.
+        """
+        self.write_report(output_file, self.suggest_fixes(), chunk_size=chunk_size)
+
+    def write_report(self, output_file: str, fixes, broken_order: List[str] = None, chunk_size: int = 1000):
+        """
+        Write the HTML report from fixes that have already been worked out
+
+        Args:
+            output_file: Report page; its data chunks go to <report name>_data
+            fixes: Fix dicts with broken_url and impact, e.g. from suggest_fixes
+            broken_order: Broken URLs in table order; by impact, once fixes are consumed, if not given
+            chunk_size: Rows per data chunk
+        """
         logger.info(f"Generating report: {output_file}")
-        
-        fixes = list(self.suggest_fixes())
-        
-        # Prepare report data
-        report_data = {
-            'base_url': self.base_url,
-            'stats': {
-                'total_pages': len(self.visited_urls),
-                'total_links': len(self.link_contexts),
-                'broken_links': len(self.broken_links),
-                'auto_fixes': len([f for f in fixes if f['source'] == 'automatic']),
-                'ai_fixes': len([f for f in fixes if f['source'] == 'ai'])
-            },
-            'broken_links': self.broken_links,
-            'fixes': fixes,
-            'redirect_map': self.redirect_map
-        }
-        
+        output_path = Path(output_file)
+        data_dir = output_path.with_name(f"{output_path.stem}_data")
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        stats = {'auto_fixes': 0, 'ai_fixes': 0}
+        fix_rows, fixes = fixes, _ReportChunkWriter(data_dir, 'fixes', chunk_size)
+        for fix in fix_rows:
+            stats['auto_fixes' if fix['source'] == 'automatic' else 'ai_fixes'] += 1
+            suggestion = fix['suggestion']
+            if fix.get('possible_correct_urls'):
+                suggestion += " (possible URLs: " + ", ".join(fix['possible_correct_urls']) + ")"
+            fixes.add({
+                'broken_url': fix['broken_url'],
+                'type': fix['type'].replace('_', ' ').title(),
+                'suggestion': suggestion,
+                'confidence': fix['confidence'],
+                'impact': fix['impact'],
+                'referrer_count': len(self.broken_links[fix['broken_url']])
+            })
+        fixes.close()
+
+        impact = self.link_impact
+        if broken_order is None:
+            broken_order = sorted(self.broken_links, key=impact.get, reverse=True)
+        broken = _ReportChunkWriter(data_dir, 'broken', chunk_size)
+        for url in broken_order:
+            occurrences = self.broken_links[url]
+            broken.add({
+                'url': url,
+                'status': occurrences[0]['status'],
+                'referrers': [occ['referrer'] for occ in occurrences[:20]],
+                'referrer_count': len(occurrences),
+                'impact': impact[url]
+            })
+        broken.close()
+
+        redirects = _ReportChunkWriter(data_dir, 'redirects', chunk_size)
+        for source, target in self.redirect_map.items():
+            redirects.add({'source': source, 'target': target})
+        redirects.close()
+        current_chunks = {chunk for writer in (fixes, broken, redirects) for chunk in writer.files}
+        for old_chunk in data_dir.glob('*.js'):
+            if old_chunk not in current_chunks:
+                old_chunk.unlink()
+
+        orphans = self.link_graph.orphan_pages(self.visited_urls, self.normalize_url(self.base_url))
+        report_config = json.dumps({
+            'dataDir': data_dir.name,
+            'chunkSize': chunk_size,
+            'tables': {writer.name: {'rows': writer.rows, 'chunks': writer.chunks}
+                       for writer in (fixes, broken, redirects)}
+        }).replace('</', '<\\/')
+
         # Generate HTML report
         html_template = f"""
         <!DOCTYPE html>
         <html>
         <head>
+            <meta charset="utf-8">
             <title>Link Repair Report for {self.base_url}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }}
-                h1, h2 {{ color: #2c3e50; }}
-                .summary {{ background: #f8f9fa; padding: 15px; border-radius: 5px; }}
-                .fix-card {{ border: 1px solid #ddd; padding: 15px; margin-bottom: 15px; border-radius: 5px; }}
-                .automatic {{ border-left: 4px solid #2ecc71; }}
-                .ai {{ border-left: 4px solid #3498db; }}
-                .confidence {{ display: inline-block; padding: 2px 5px; background: #eee; border-radius: 3px; }}
-                .high-confidence {{ background: #d4edda; }}
-                .medium-confidence {{ background: #fff3cd; }}
-                table {{ width: 100%; border-collapse: collapse; }}
-                th, td {{ padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }}
-                tr:hover {{ background-color: #f5f5f5; }}
-            </style>
+            <style>{self.REPORT_STYLE}            </style>
         </head>
         <body>
             <h1>Link Repair Report for {self.base_url}</h1>
@@ -452,60 +3221,26 @@ class AILinkRepairAgent:
             <div class="summary">
                 <h2>Summary</h2>
                 <ul>
-                    <li>Pages crawled: {report_data['stats']['total_pages']}</li>
-                    <li>Total links found: {report_data['stats']['total_links']}</li>
-                    <li>Broken links found: {report_data['stats']['broken_links']}</li>
-                    <li>Automatic fixes suggested: {report_data['stats']['auto_fixes']}</li>
-                    <li>AI-powered fixes suggested: {report_data['stats']['ai_fixes']}</li>
+                    <li>Pages crawled: {len(self.visited_urls)}</li>
+                    <li>Total links found: {len(self.link_contexts)}</li>
+                    <li>Broken links found: {len(self.broken_links)}</li>
+                    <li>Pages no other page links to: {len(orphans)}</li>
+                    <li>Automatic fixes suggested: {stats['auto_fixes']}</li>
+                    <li>AI-powered fixes suggested: {stats['ai_fixes']}</li>
                 </ul>
             </div>
             
             <h2>Suggested Fixes</h2>
-            {"".join([
-                f"""
-                <div class="fix-card {'automatic' if fix['source'] == 'automatic' else 'ai'}">
-                    <h3>{fix['broken_url']}</h3>
-                    <p><strong>Type:</strong> {fix['type'].replace('_', ' ').title()}</p>
-                    <p><strong>Suggestion:</strong> {fix['suggestion']}</p>
-                    <p><strong>Confidence:</strong> <span class="confidence {'high-confidence' if fix['confidence'] > 80 else 'medium-confidence'}">{fix['confidence']}%</span></p>
-                    {'' if not fix.get('possible_correct_urls') else f"<p><strong>Possible URLs:</strong><br>" + "<br>".join(fix['possible_correct_urls']) + "</p>"}
-                    <p><strong>Found on pages:</strong></p>
-                    <ul>
-                        {"".join([f"<li><a href='{occ['referrer']}' target='_blank'>{occ['referrer']}</a></li>" for occ in report_data['broken_links'][fix['broken_url']])}
-                    </ul>
-                </div>
-                """ for fix in report_data['fixes']
-            ])}
+            <div id="fixes"></div>
             
             <h2>All Broken Links</h2>
-            <table>
-                <tr>
-                    <th>Broken URL</th>
-                    <th>Referrer</th>
-                    <th>Status</th>
-                </tr>
-                {"".join([
-                    f"""
-                    <tr>
-                        <td><a href="{url}" target="_blank">{url}</a></td>
-                        <td><a href="{occ['referrer']}" target="_blank">{occ['referrer']}</a></td>
-                        <td>{occ['status']}</td>
-                    </tr>
-                    """ for url, occurrences in report_data['broken_links'].items() for occ in occurrences
-                ])}
-            </table>
+            <div id="broken"></div>
             
             <h2>Redirect Mapping</h2>
-            <table>
-                <tr>
-                    <th>Original URL</th>
-                    <th>Redirects To</th>
-                </tr>
-                {"".join([
-                    f"<tr><td><a href='{src}' target='_blank'>{src}</a></td><td><a href='{dest}' target='_blank'>{dest}</a></td></tr>"
-                    for src, dest in report_data['redirect_map'].items()
-                ])}
-            </table>
+            <div id="redirects"></div>
+
+            <script>const REPORT = {report_config};</script>
+            <script>{self.REPORT_SCRIPT}</script>
         </body>
         </html>
         """
@@ -515,31 +3250,627 @@ class AILinkRepairAgent:
         
         logger.info(f"Report generated successfully: {output_file}")
 
+    def save_snapshot(self, path: str):
+        """
+        Write a compact, sorted snapshot of the run's broken links
+
+        Each gzipped line holds url, status and referrer count, sorted by URL so
+        two snapshots can be diffed in one streaming merge.
+        """
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(f"# ailinkrepair snapshot v1 {self.base_url}\n")
+            for url in sorted(self.broken_links):
+                occurrences = self.broken_links[url]
+                f.write(f"{url}\t{occurrences[0]['status']}\t{len(occurrences)}\n")
+        logger.info(f"Snapshot saved: {path}")
+
+    def generate_diff_report(self, previous_snapshot: str, output_file: str = 'link_repair_diff.html'):
+        """Render only the links that broke or were fixed since a previous snapshot"""
+        logger.info(f"Generating diff report against {previous_snapshot}: {output_file}")
+        current_snapshot = Path(output_file).with_suffix('.snapshot.gz')
+        # The previous snapshot is often this very file from the last run, so it is
+        # only replaced once the diff has been read
+        partial_snapshot = current_snapshot.with_name(f"{current_snapshot.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self.save_snapshot(str(partial_snapshot))
+            diff = diff_snapshots(previous_snapshot, str(partial_snapshot))
+            os.replace(partial_snapshot, current_snapshot)
+        finally:
+            partial_snapshot.unlink(missing_ok=True)
+
+        def rows(entries, with_referrers):
+            out = []
+            for url, old_status, new_status in entries:
+                referrers = ''
+                if with_referrers:
+                    referrers = "<br>".join(
+                        f"<a href='{html.escape(occ['referrer'])}' target='_blank'>{html.escape(occ['referrer'])}</a>"
+                        for occ in self.broken_links.get(url, [])
+                    )
+                out.append(
+                    f"<tr><td><a href='{html.escape(url)}' target='_blank'>{html.escape(url)}</a></td>"
+                    f"<td>{html.escape(old_status or '-')}</td><td>{html.escape(new_status or '-')}</td>"
+                    f"<td>{referrers}</td></tr>"
+                )
+            return "\n".join(out)
+
+        table_head = "<tr><th>URL</th><th>Previous status</th><th>Current status</th><th>Referrers</th></tr>"
+        html_template = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Link Changes for {self.base_url}</title>
+            <style>{self.REPORT_STYLE}</style>
+        </head>
+        <body>
+            <h1>Link Changes for {self.base_url}</h1>
+
+            <div class="summary">
+                <h2>Summary</h2>
+                <ul>
+                    <li>Newly broken: {len(diff['new'])}</li>
+                    <li>Fixed: {len(diff['fixed'])}</li>
+                    <li>Still broken: {diff['still_broken']}</li>
+                </ul>
+            </div>
+
+            <h2>Newly Broken</h2>
+            <table>{table_head}{rows(diff['new'], True)}</table>
+
+            <h2>Fixed</h2>
+            <table>{table_head}{rows(diff['fixed'], False)}</table>
+        </body>
+        </html>
+        """
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(html_template)
+
+        logger.info(f"Diff report generated successfully: {output_file}")
+        return diff
+
+
+def _read_snapshot(path: str):
+    """Yield (url, status) from a snapshot file in URL order"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            url, status, _ = line.rstrip('\n').split('\t')
+            yield url, status
+
+
+def diff_snapshots(old_path: str, new_path: str) -> dict:
+    """
+    Compare two snapshots with a streaming merge of their sorted entries
+
+    Returns:
+        Dict with 'new' and 'fixed' lists of (url, old_status, new_status)
+        and a 'still_broken' count
+    """
+    old_entries, new_entries = _read_snapshot(old_path), _read_snapshot(new_path)
+    old, new = next(old_entries, None), next(new_entries, None)
+    diff = {'new': [], 'fixed': [], 'still_broken': 0}
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            diff['fixed'].append((old[0], old[1], None))
+            old = next(old_entries, None)
+        elif old is None or new[0] < old[0]:
+            diff['new'].append((new[0], None, new[1]))
+            new = next(new_entries, None)
+        else:
+            diff['still_broken'] += 1
+            old, new = next(old_entries, None), next(new_entries, None)
+    return diff
+
+
+class LinkMonitor:
+    """
+    Long-running monitor that keeps an agent warm and re-checks its links on a schedule
+
+    Recently broken links and links with many referring pages are re-checked
+    first. Checks are rate limited and their first due times are staggered
+    across the interval, so load on the origin stays flat. A timeout, 5xx or
+    429 on a working link is retried with backoff before it counts as broken.
+    The link graph and the fixes worked out at the last crawl are kept between
+    ticks; a status change only works out impact and fixes for the links that
+    changed.
+    """
+
+    def __init__(self, agent: AILinkRepairAgent, output_file: str, recheck_interval: float = 3600,
+                 checks_per_minute: int = 60, recrawl_interval: float = 24 * 3600):
+        """
+        Args:
+            agent: Agent whose caches and crawl state are kept in memory
+            output_file: Report rewritten whenever link status changes
+            recheck_interval: Seconds between checks of a healthy link (broken links get a quarter of this)
+            checks_per_minute: Upper bound on re-checks sent per minute
+            recrawl_interval: Seconds between full crawls that discover new pages
+        """
+        self.agent = agent
+        self.output_file = output_file
+        self.recheck_interval = recheck_interval
+        self.checks_per_minute = checks_per_minute
+        self.recrawl_interval = recrawl_interval
+        self.stop_event = threading.Event()
+        self._heap = []  # (due_time, url)
+        self._retries = _RetryScheduler(max_retries=agent.retry_scheduler.max_retries)
+        self._next_recrawl = 0.0
+        self.fixes = {}  # broken URL -> fixes, in report order
+
+    def _priority(self, url: str) -> int:
+        """Broken links first, then links with the most referring pages"""
+        referrers = len(self.agent.link_contexts.get(url, ()))
+        return referrers + (1_000_000 if url in self.agent.broken_links else 0)
+
+    def _schedule(self, url: str, first: bool = False):
+        interval = self.recheck_interval / 4 if url in self.agent.broken_links else self.recheck_interval
+        # Spread the first round evenly over the interval instead of checking everything at once
+        delay = random.uniform(0, interval) if first else interval
+        heapq.heappush(self._heap, (time.monotonic() + delay, url))
+
+    def recrawl(self):
+        """Crawl the site again to pick up new pages and links, then reschedule every link"""
+        logger.info(f"Monitor crawling {self.agent.base_url}")
+        self.agent.reset_crawl()
+        self.agent.crawl_site(refresh=True)
+        fixes = defaultdict(list)
+        for fix in self.agent.suggest_fixes():
+            fixes[fix['broken_url']].append(fix)
+        impact = self.agent.link_impact
+        self.fixes = {url: fixes[url] for url in sorted(impact, key=impact.get, reverse=True)}
+        self._write_report()
+        self._heap = []
+        self._retries = _RetryScheduler(max_retries=self.agent.retry_scheduler.max_retries)
+        for url in self.agent.link_contexts:
+            self._schedule(url, first=True)
+        self._next_recrawl = time.monotonic() + self.recrawl_interval
+
+    def _record(self, url: str, status, final_url: Optional[str], error: Optional[str], kind: Optional[str]) -> bool:
+        """Update broken_links for a re-checked URL, returning True if its state changed"""
+        was_broken = url in self.agent.broken_links
+        is_broken = kind is not None
+        if is_broken:
+            self.agent.broken_links[url] = [
+                {'referrer': referrer, 'status': status, 'final_url': final_url, 'error': error, 'kind': kind}
+                for referrer in self.agent.link_contexts.get(url, {})
+            ]
+            if not was_broken:
+                logger.warning(f"ALERT: {url} is now broken ({error or status}), "
+                               f"linked from {len(self.agent.broken_links[url])} pages")
+        elif was_broken:
+            del self.agent.broken_links[url]
+            logger.info(f"Fixed: {url} now returns {status}")
+        return was_broken != is_broken
+
+    def tick(self, executor: concurrent.futures.Executor, budget: int) -> int:
+        """
+        Re-check up to budget links that are due, retries that have come up included
+
+        Returns:
+            Number of links checked
+        """
+        now = time.monotonic()
+        attempts = {url: attempt for url, _, attempt in self._retries.pop_due()}
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        if not due and not attempts:
+            return 0
+        # When more is due than the budget allows, the highest priorities go first
+        budget = max(0, budget - len(attempts))
+        due.sort(key=lambda entry: self._priority(entry[1]), reverse=True)
+        for entry in due[budget:]:
+            heapq.heappush(self._heap, entry)
+        for _, url in due[:budget]:
+            attempts[url] = 0
+
+        newly_broken, fixed = [], []
+        futures = [self.agent.limiter.submit(executor, urlparse(url).netloc, self.agent.check_url, url, True)
+                   for url in attempts]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            url, status, _, error, kind = result
+            if kind in self.agent.TRANSIENT_FAILURES and url not in self.agent.broken_links:
+                # One timeout or overloaded response is not an outage; back off and look again first
+                if self._retries.schedule(url, (), attempts[url] + 1):
+                    continue
+                logger.warning(f"Giving up on {url} after {attempts[url]} retries: {error or status}")
+            if self._record(*result):
+                (newly_broken if url in self.agent.broken_links else fixed).append(url)
+            self._schedule(url)
+
+        if newly_broken or fixed:
+            self._update_fixes(executor, newly_broken, fixed)
+            self._write_report()
+        return len(attempts)
+
+    def _update_fixes(self, executor: concurrent.futures.Executor, newly_broken: List[str], fixed: List[str]):
+        """Work out impact and fixes for links that just broke, against the graph from the last crawl"""
+        for url in fixed:
+            self.fixes.pop(url, None)
+            self.agent.link_impact.pop(url, None)
+        if not newly_broken:
+            return
+        impact = self.agent.link_graph.broken_link_impact(newly_broken)
+        self.agent.link_impact.update(impact)
+        similar = self.agent.suggest_similar_pages(urls=newly_broken)
+        verified = self.agent._fix_batch(executor, newly_broken, similar)
+        for url in newly_broken:
+            # Appended, so the report chunks before the new rows stay as they are
+            self.fixes[url] = [dict(fix, broken_url=url, impact=impact[url]) for fix in verified[url]]
+
+    def _write_report(self):
+        fixes = (fix for url_fixes in self.fixes.values() for fix in url_fixes)
+        self.agent.write_report(self.output_file, fixes, list(self.fixes))
+
+    def run(self):
+        """Run until stop_event is set"""
+        tick_seconds = 5.0
+        budget = max(1, round(self.checks_per_minute * tick_seconds / 60))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.agent.max_workers) as executor:
+            while not self.stop_event.is_set():
+                if time.monotonic() >= self._next_recrawl:
+                    self.recrawl()
+                checked = self.tick(executor, budget)
+                if checked:
+                    logger.info(f"Monitor re-checked {checked} links, {len(self._heap)} scheduled, "
+                                f"{len(self.agent.broken_links)} broken")
+                self.stop_event.wait(tick_seconds)
+
+
+def read_site_list(source: str) -> List[str]:
+    """Read one site URL per line from a file, or from stdin if source is '-'"""
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def report_name(site_url: str) -> str:
+    """File-system friendly report name for a site, e.g. https_example.com_docs"""
+    parsed = urlparse(site_url)
+    # The scheme keeps the http:// and https:// versions of a site apart
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', f"{parsed.scheme}_{parsed.netloc}{parsed.path}").strip('_') or 'site'
+
+
+def run_batch(sites: List[str], output_dir: str, max_workers: int = 10, site_concurrency: int = 4,
+              **agent_kwargs) -> dict:
+    """
+    Scan many sites over one shared worker pool, HTTP session, concurrency limiter and cache
+
+    Each site gets its own crawl coordinator, but all link checks go through a
+    single FIFO worker pool, so sites interleave fairly instead of queueing
+    behind each other.
+
+    Args:
+        sites: Base URLs to scan
+        output_dir: Directory for per-site reports and summary.json
+        max_workers: Size of the shared link-check pool
+        site_concurrency: Number of sites crawled at the same time
+        agent_kwargs: Passed on to every AILinkRepairAgent
+
+    Returns:
+        Aggregate summary, also written to output_dir/summary.json
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    session = AILinkRepairAgent.create_session(max_workers, http2=agent_kwargs.get('http2', False))
+    limiter = agent_kwargs.pop('concurrency_limiter', None) or HostConcurrencyLimiter(
+        min_limit=agent_kwargs.pop('min_host_concurrency', 1),
+        max_limit=agent_kwargs.pop('max_host_concurrency', None) or max_workers
+    )
+    started = time.monotonic()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as check_pool:
+        def scan(site_url):
+            report_file = output_path / f"{report_name(site_url)}.html"
+            agent = None
+            try:
+                agent = AILinkRepairAgent(site_url, max_workers=max_workers, session=session,
+                                          concurrency_limiter=limiter, **agent_kwargs)
+                agent.crawl_site(executor=check_pool)
+                if not agent.url_structure:
+                    logger.error(f"Scan of {site_url} failed: start page could not be fetched")
+                    return {'site': site_url, 'error': 'start page could not be fetched', 'unreachable': True}
+                agent.generate_report(str(report_file))
+            except Exception as e:
+                logger.error(f"Scan of {site_url} failed: {str(e)}")
+                return {'site': site_url, 'error': str(e)}
+            finally:
+                if agent is not None:
+                    agent.close()
+            return {
+                'site': site_url,
+                'report': str(report_file),
+                'pages': len(agent.visited_urls),
+                'links': len(agent.link_contexts),
+                'broken_links': len(agent.broken_links)
+            }
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=site_concurrency) as site_pool:
+            results = list(site_pool.map(scan, sites))
+    session.close()
+
+    summary = {
+        'sites': len(results),
+        'failed_sites': sum(1 for r in results if 'error' in r),
+        'unreachable_sites': sum(1 for r in results if r.get('unreachable')),
+        'pages': sum(r.get('pages', 0) for r in results),
+        'links': sum(r.get('links', 0) for r in results),
+        'broken_links': sum(r.get('broken_links', 0) for r in results),
+        'elapsed_seconds': round(time.monotonic() - started, 1),
+        'results': results
+    }
+    with open(output_path / 'summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def benchmark_backends(url: str, max_workers: int = 10, **agent_kwargs) -> Dict[str, dict]:
+    """
+    Crawl a site over HTTP/1.1 and then over HTTP/2, each with a cold cache
+
+    Args:
+        url: Site to crawl, e.g. a local h2-capable test server
+        max_workers: Link-check pool size for both runs
+        agent_kwargs: Passed on to both AILinkRepairAgents
+
+    Returns:
+        {'http/1.1': stats, 'http/2': stats}, each with seconds, pages, links and broken_links
+    """
+    import tempfile
+
+    for key in ('cache_dir', 'http2', 'session', 'shared_cache'):
+        agent_kwargs.pop(key, None)
+    results = {}
+    for name, http2 in (('http/1.1', False), ('http/2', True)):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            agent = AILinkRepairAgent(url, max_workers=max_workers, cache_dir=cache_dir, http2=http2, **agent_kwargs)
+            started = time.monotonic()
+            agent.crawl_site()
+            results[name] = {
+                'seconds': round(time.monotonic() - started, 3),
+                'pages': len(agent.visited_urls),
+                'links': len(agent.link_contexts),
+                'broken_links': len(agent.broken_links)
+            }
+            agent.close()
+    return results
+
+
+def benchmark_canonicalizer(href_count: int = 2_000_000, distinct: int = 20_000, seed: int = 0) -> dict:
+    """
+    Time resolving and normalizing hrefs the old way and through URLCanonicalizer
+
+    The old way is the urljoin, urlparse/urlunparse and validity check that
+    find_links used to run for every tag. hrefs are drawn from a fixed pool
+    of distinct spellings, relative and absolute, with mixed-case hosts,
+    default ports, index files and escaped characters, as on a real site
+    where the same navigation links repeat on every page. Each page is
+    spelled four ways, so fewer distinct URLs means fewer checks.
+
+    Returns:
+        Seconds for each path, plus the distinct URLs each one produced
+    """
+    base = 'https://example.com/'
+    rng = random.Random(seed)
+    pool = []
+    for i in range(distinct):
+        # Four spellings of each page, and an external asset every tenth entry
+        path = f"docs/section-{i // 4 % 500}/page-{i // 4}"
+        pool.append(f"https://cdn{i % 7}.example.net/{path}.js" if i % 10 == 9 else [
+            f"/{path}",
+            f"{path}/index.html",
+            f"https://EXAMPLE.com:443/{path}#top",
+            f"https://example.com/{path.replace('-', '%2D')}?ref=nav"
+        ][i % 4])
+    hrefs = [rng.choice(pool) for _ in range(href_count)]
+
+    def old_path(href):
+        absolute = urljoin(base, href)
+        normalized = urlunparse(urlparse(absolute)._replace(fragment='', query='')).rstrip('/')
+        parsed = urlparse(normalized)
+        return normalized if parsed.netloc and parsed.scheme else None
+
+    results = {'hrefs': href_count, 'distinct_hrefs': len(set(hrefs))}
+    unmemoized = URLCanonicalizer(memo_size=0)
+    memoized = URLCanonicalizer()
+    for name, resolve in (('old', old_path),
+                          ('canonicalizer_unmemoized', functools.partial(unmemoized.canonicalize, base=base)),
+                          ('canonicalizer', functools.partial(memoized.canonicalize, base=base))):
+        started = time.perf_counter()
+        urls = set(map(resolve, hrefs))
+        results[f"{name}_seconds"] = round(time.perf_counter() - started, 3)
+        results[f"{name}_urls"] = len(urls)
+    return results
+
+
+IMPORT_TIME_BUDGET_MS = 60
+
+
+def measure_import_time(module: str = 'automate', runs: int = 5) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Time a fresh-interpreter import of a module with python -X importtime
+
+    Args:
+        module: Module to import, looked up next to this file
+        runs: Imports to time; the fastest counts, to filter out noise
+
+    Returns:
+        (cumulative import time in ms, [(ms, name)] of its slowest direct imports)
+    """
+    import subprocess
+
+    best, slowest = None, []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                capture_output=True, text=True, cwd=Path(__file__).resolve().parent)
+        children = []
+        for line in result.stderr.splitlines():
+            parts = line.split('|')
+            if not line.startswith('import time:') or len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].rstrip()
+            depth = len(name) - len(name.lstrip())
+            cumulative_ms = int(parts[1]) / 1000
+            if depth == 1 and name.strip() == module:
+                if best is None or cumulative_ms < best:
+                    best, slowest = cumulative_ms, sorted(children, reverse=True)[:10]
+                break
+            if depth == 1:
+                children = []
+            elif depth == 3:
+                children.append((cumulative_ms, name.strip()))
+    if best is None:
+        raise RuntimeError(f"Could not import {module}: {result.stderr.strip()[-500:]}")
+    return best, slowest
+
+
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description='AI-powered website link repair tool')
-    parser.add_argument('url', help='Base URL of the website to scan')
+    parser.add_argument('url', nargs='?', help='Base URL of the website to scan')
+    parser.add_argument('--startup-benchmark', action='store_true',
+                        help='Time importing this module with -X importtime and exit non-zero over budget')
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_TIME_BUDGET_MS,
+                        help=f'Import time budget for --startup-benchmark (default: {IMPORT_TIME_BUDGET_MS} ms)')
+    parser.add_argument('--sites', help="File with one site URL per line ('-' for stdin) to scan as a batch")
+    parser.add_argument('--output-dir', default='link_repair_reports', help='Report directory for --sites')
+    parser.add_argument('--site-concurrency', type=int, default=4, help='Sites crawled at once with --sites')
     parser.add_argument('--openai-key', help='OpenAI API key (or set OPENAI_API_KEY environment variable)')
     parser.add_argument('--workers', type=int, default=10, help='Number of concurrent workers')
     parser.add_argument('--timeout', type=int, default=10, help='Request timeout in seconds')
     parser.add_argument('--output', default='link_repair_report.html', help='Output report file')
     parser.add_argument('--user-agent', help='Custom User-Agent string')
+    parser.add_argument('--shared-cache',
+                        help='Link status cache shared across sites and runs '
+                             '(default: external-links.sqlite3 in --cache-dir; empty string to disable)')
+    parser.add_argument('--snapshot', help='Save a snapshot of the broken links found to this file')
+    parser.add_argument('--since', help='Previous snapshot; report only links that broke or were fixed since then')
+    parser.add_argument('--daemon', action='store_true', help='Keep running and re-check links on a schedule')
+    parser.add_argument('--recheck-interval', type=float, default=3600, help='Seconds between re-checks of a link in --daemon mode')
+    parser.add_argument('--checks-per-minute', type=int, default=60, help='Re-check rate limit in --daemon mode')
+    parser.add_argument('--visited-store', help='SQLite file for a disk-backed visited set on very large sites')
+    parser.add_argument('--max-pages-per-pattern', type=int,
+                        help='Crawl at most this many pages per URL pattern (digits generalized)')
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument('--record', metavar='ARCHIVE', help='Record raw HTTP responses into an archive')
+    archive_group.add_argument('--replay', metavar='ARCHIVE',
+                               help='Serve all requests from a recorded archive, with no network '
+                                    '(pair with a fresh --cache-dir for a cold run)')
+    parser.add_argument('--cache-dir', default='.ailinkcache', help='Directory for cached checks, pages and parses')
+    parser.add_argument('--http2', action='store_true',
+                        help='Multiplex requests over HTTP/2 (needs httpx[http2]; falls back to HTTP/1.1)')
+    parser.add_argument('--benchmark-backends', action='store_true',
+                        help='Crawl url over HTTP/1.1 and HTTP/2 with cold caches and print the timings')
+    parser.add_argument('--benchmark-canonicalizer', type=int, nargs='?', const=2_000_000, metavar='HREFS',
+                        help='Time URL normalization the old way and through URLCanonicalizer on HREFS hrefs '
+                             '(default: 2000000) and print the timings')
+    parser.add_argument('--no-dns-cache', action='store_true', help='Resolve every new connection through the system resolver')
+    parser.add_argument('--dns-server', metavar='HOST[:PORT]',
+                        help='Query this DNS server directly, honouring record TTLs (needs dnspython)')
+    parser.add_argument('--min-host-concurrency', type=int, default=1,
+                        help='Lowest adaptive limit on requests in flight per host')
+    parser.add_argument('--max-host-concurrency', type=int,
+                        help='Highest adaptive limit on requests in flight per host (default: --workers)')
+    parser.add_argument('--asset-sample-rate', type=float, default=1.0,
+                        help='Fraction of image, script, stylesheet and media links to check (default: all)')
+    parser.add_argument('--results-store', help='SQLite file to stream broken links and link contexts into')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Retries for timeouts, connection resets, 5xx and 429 responses')
     
     args = parser.parse_args()
-    
-    logger.info(f"Starting AI Link Repair Agent for {args.url}")
-    agent = AILinkRepairAgent(
-        args.url,
+    if args.startup_benchmark:
+        import_ms, slowest = measure_import_time()
+        for ms, name in slowest:
+            print(f"{ms:8.1f} ms  {name}")
+        print(f"Import time: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+        sys.exit(0 if import_ms <= args.import_budget_ms else 1)
+
+    if args.benchmark_canonicalizer:
+        print(json.dumps(benchmark_canonicalizer(args.benchmark_canonicalizer), indent=2))
+        return
+
+    if not args.url and not args.sites:
+        parser.error('either url or --sites is required')
+
+    if args.shared_cache is None:
+        args.shared_cache = str(Path(args.cache_dir) / 'external-links.sqlite3')
+
+    dns_cache = None
+    if not args.no_dns_cache:
+        resolver = None
+        if args.dns_server:
+            if dns is None:
+                parser.error('--dns-server needs dnspython (pip install dnspython)')
+            server, _, port = args.dns_server.rpartition(':') if args.dns_server.count(':') == 1 \
+                else (args.dns_server, '', '')
+            resolver = DNSCache.dnspython_resolver([server], int(port or 53))
+        dns_cache = DNSCache(resolver)
+
+    agent_kwargs = dict(
         openai_api_key=args.openai_key,
-        max_workers=args.workers,
         timeout=args.timeout,
-        user_agent=args.user_agent
+        user_agent=args.user_agent,
+        max_retries=args.retries,
+        cache_dir=args.cache_dir,
+        max_pages_per_pattern=args.max_pages_per_pattern,
+        asset_sample_rate=args.asset_sample_rate,
+        min_host_concurrency=args.min_host_concurrency,
+        max_host_concurrency=args.max_host_concurrency,
+        shared_cache=SharedStatusCache(args.shared_cache) if args.shared_cache and not args.replay else None,
+        archive=HTTPArchive(args.record, 'record') if args.record
+        else HTTPArchive(args.replay, 'replay') if args.replay else None,
+        dns_cache=dns_cache,
+        http2=args.http2
     )
-    
-    # Crawl the website
-    agent.crawl_site()
-    
-    # Generate report
-    agent.generate_report(args.output)
+
+    if args.benchmark_backends:
+        if not args.url:
+            parser.error('--benchmark-backends needs a url')
+        print(json.dumps(benchmark_backends(args.url, args.workers, **agent_kwargs), indent=2))
+        return
+
+    if args.sites:
+        sites = read_site_list(args.sites)
+        logger.info(f"Starting batch scan of {len(sites)} sites")
+        summary = run_batch(sites, args.output_dir, max_workers=args.workers,
+                            site_concurrency=args.site_concurrency, **agent_kwargs)
+        logger.info(f"Batch complete: {summary['broken_links']} broken links across {summary['sites']} sites "
+                    f"({summary['failed_sites']} failed) in {summary['elapsed_seconds']}s")
+        logger.info(f"Reports written to: {args.output_dir}")
+        return
+
+    logger.info(f"Starting AI Link Repair Agent for {args.url}")
+    agent = AILinkRepairAgent(args.url, max_workers=args.workers, visited_store=args.visited_store,
+                              results_store=args.results_store, **agent_kwargs)
+
+    try:
+        if args.daemon:
+            monitor = LinkMonitor(agent, args.output, recheck_interval=args.recheck_interval,
+                                  checks_per_minute=args.checks_per_minute)
+            try:
+                monitor.run()
+            except KeyboardInterrupt:
+                logger.info("Monitor stopped")
+            return
+
+        # Crawl the website
+        agent.crawl_site()
+
+        # Generate report
+        if args.since:
+            agent.generate_diff_report(args.since, args.output)
+        else:
+            agent.generate_report(args.output)
+        if args.snapshot:
+            agent.save_snapshot(args.snapshot)
+    finally:
+        agent.close()
     
     logger.info("\nScan complete!")
     logger.info(f"Found {len(agent.broken_links)} broken links.")
@@ -0,0 +1,426 @@
+"""
+Streaming min, max, sum, mean and count over huge ranges and number files
+
+list.py's commented-out example appends a billion ints to a list before
+calling min(), max() and sum(), which needs tens of GB of memory, and its
+squares loop keeps overwriting one value. This module computes the same
+statistics, optionally over mapped values such as squares and cubes, in
+constant memory:
+
+- 'python': one pass over any iterable, with exact integer sums
+- 'numpy': vectorized over fixed-size chunks of a range, a text file with
+  one number per line, or a binary file (raw with a dtype, or .npy) that is
+  memory-mapped rather than read
+- 'processes': the NumPy (or plain) pass split across a process pool, for
+  ranges and binary files
+- 'exact': closed-form sums of powers for ranges, with no pass at all
+
+Run this module to benchmark them against the plain-list approach.
+"""
+from array import array
+from itertools import islice
+from math import comb
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+import concurrent.futures
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Only the 'python' and 'exact' methods work without NumPy
+    np = None
+
+
+def identity(x):
+    return x
+
+
+def square(x):
+    return x * x
+
+
+def cube(x):
+    return x * x * x
+
+
+# Module-level functions, so they can be sent to worker processes
+TRANSFORMS = {'identity': identity, 'square': square, 'cube': cube}
+POWERS = {'identity': 1, 'square': 2, 'cube': 3}
+
+# array typecodes for reading raw binary files without NumPy
+TYPECODES = {'int8': 'b', 'uint8': 'B', 'int16': 'h', 'uint16': 'H', 'int32': 'i', 'uint32': 'I',
+             'int64': 'q', 'uint64': 'Q', 'float32': 'f', 'float64': 'd'}
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+Source = Union[range, str, Path, Iterable]
+
+
+class Aggregate:
+    """Running count, min, max and sum that can be merged with others"""
+    __slots__ = ('count', 'minimum', 'maximum', 'total', 'exact')
+
+    def __init__(self, count: int = 0, minimum=None, maximum=None, total=0, exact: bool = True):
+        """
+        Args:
+            count: Values seen
+            minimum: Smallest value, None while empty
+            maximum: Largest value, None while empty
+            total: Sum of the values
+            exact: False if integer values had to be summed as floats to avoid overflow
+        """
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = total
+        self.exact = exact
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def add(self, value):
+        if self.count == 0:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Aggregate') -> 'Aggregate':
+        """Fold another partial aggregate into this one"""
+        if other.count:
+            if self.count == 0:
+                self.minimum, self.maximum = other.minimum, other.maximum
+            else:
+                self.minimum = min(self.minimum, other.minimum)
+                self.maximum = max(self.maximum, other.maximum)
+            self.count += other.count
+            self.total += other.total
+            self.exact = self.exact and other.exact
+        return self
+
+    def as_dict(self) -> dict:
+        return {'count': self.count, 'min': self.minimum, 'max': self.maximum,
+                'sum': self.total, 'mean': self.mean, 'exact': self.exact}
+
+    def __eq__(self, other):
+        return isinstance(other, Aggregate) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return (f"Aggregate(count={self.count}, min={self.minimum}, max={self.maximum}, "
+                f"sum={self.total}, mean={self.mean})")
+
+
+def _resolve_transform(transform) -> Callable:
+    return TRANSFORMS[transform] if isinstance(transform, str) else transform
+
+
+def read_numbers(path: Union[str, Path]) -> Iterator[Union[int, float]]:
+    """Stream the numbers in a text file with one per line, as ints where possible"""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield int(line)
+                except ValueError:
+                    yield float(line)
+
+
+def read_binary(path: Union[str, Path], dtype: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator:
+    """Stream the values of a raw binary file without NumPy, one chunk in memory at a time"""
+    typecode = TYPECODES[dtype]
+    with open(path, 'rb') as f:
+        while True:
+            values = array(typecode)
+            try:
+                values.fromfile(f, chunk_size)
+            except EOFError:
+                pass  # The last chunk is shorter; what was read is kept
+            if not values:
+                return
+            yield from values
+
+
+def aggregate_python(values: Iterable, transform='identity') -> Aggregate:
+    """One pass over any iterable, keeping nothing but the running totals"""
+    transform = _resolve_transform(transform)
+    iterator = map(transform, values)
+    for first in iterator:
+        break
+    else:
+        return Aggregate()
+    # Running totals live in locals; attribute updates per value cost more than the work
+    count, minimum, maximum, total = 1, first, first, first
+    for value in iterator:
+        count += 1
+        total += value
+        if value < minimum:
+            minimum = value
+        elif value > maximum:
+            maximum = value
+    return Aggregate(count, minimum, maximum, total)
+
+
+def _sum_of_powers(m: int, j: int) -> int:
+    """0^j + 1^j + ... + m^j"""
+    return [m + 1, m * (m + 1) // 2, m * (m + 1) * (2 * m + 1) // 6, (m * (m + 1) // 2) ** 2][j]
+
+
+def aggregate_range_exact(r: range, transform='identity') -> Aggregate:
+    """
+    Aggregate a range of identities, squares or cubes in closed form
+
+    Sums use Faulhaber's formulas on the arithmetic progression, so a range
+    of any length costs the same few integer operations.
+    """
+    power = POWERS[transform]
+    if not r:
+        return Aggregate()
+    if r.step < 0:
+        r = r[::-1]
+    first, step, n = r.start, r.step, len(r)
+    total = sum(comb(power, j) * first ** (power - j) * step ** j * _sum_of_powers(n - 1, j)
+                for j in range(power + 1))
+    ends = [first ** power, r[-1] ** power]
+    if power % 2 == 0 and first < 0 < r[-1]:
+        # Squares are smallest at the values either side of zero
+        k = -first // step
+        ends += [r[k] ** power, r[min(k + 1, n - 1)] ** power]
+    return Aggregate(n, min(ends), max(ends), total)
+
+
+def _number_array(numbers: list):
+    """A chunk of numbers as an array that keeps ints exact: int64 where they fit, Python ints beyond"""
+    if all(isinstance(number, (int, np.integer)) for number in numbers):
+        try:
+            return np.array(numbers, dtype=np.int64)
+        except OverflowError:
+            return np.array(numbers, dtype=object)
+    return np.array(numbers, dtype=np.float64)
+
+
+def _numpy_chunks(source: Source, chunk_size: int, dtype: str = None, start: int = 0,
+                  stop: int = None) -> Iterator:
+    """Yield a source as NumPy arrays of at most chunk_size values"""
+    if isinstance(source, range):
+        for begin in range(start, len(source) if stop is None else stop, chunk_size):
+            part = source[begin:begin + chunk_size] if stop is None else source[begin:min(begin + chunk_size, stop)]
+            yield np.arange(part.start, part.stop, part.step, dtype=np.int64)
+    elif isinstance(source, (str, Path)) and (dtype or str(source).endswith('.npy')):
+        if not str(source).endswith('.npy') and not os.path.getsize(source):
+            return  # Zero bytes can't be memory-mapped, and hold no values anyway
+        data = np.load(source, mmap_mode='r') if str(source).endswith('.npy') \
+            else np.memmap(source, dtype=dtype, mode='r')
+        data = data.reshape(-1)
+        end = len(data) if stop is None else stop
+        for begin in range(start, end, chunk_size):
+            yield np.asarray(data[begin:min(begin + chunk_size, end)])
+    elif isinstance(source, (str, Path)):
+        with open(source) as f:
+            while True:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    return
+                tokens = [line.strip() for line in lines if line.strip()]
+                try:
+                    # Parsed as ints first, as read_numbers does, so values past 2**53 stay exact
+                    numbers = [int(token) for token in tokens]
+                except ValueError:
+                    yield np.array(tokens, dtype=np.float64)
+                    continue
+                yield _number_array(numbers)
+    else:
+        iterator = iter(source)
+        while True:
+            numbers = list(islice(iterator, chunk_size))
+            if not numbers:
+                return
+            yield _number_array(numbers)
+
+
+def _exact_int_sum(values) -> int:
+    """Sum int64 values without overflow, by splitting each into 32-bit halves"""
+    high = int(np.sum(values >> 32, dtype=np.int64))
+    low = int(np.sum(values & 0xFFFFFFFF, dtype=np.int64))
+    return (high << 32) + low
+
+
+def _aggregate_chunk(values, transform: Callable) -> Aggregate:
+    if not values.size:
+        return Aggregate()
+    if values.dtype.kind == 'O':
+        return aggregate_python(values.tolist(), transform)
+    if values.dtype.kind in 'iu':
+        # Transformed ints must stay clear of int64 overflow; check on a float copy first
+        estimate = transform(values.astype(np.float64))
+        if np.max(np.abs(estimate)) < 2 ** 62:
+            mapped = transform(values.astype(np.int64))
+            return Aggregate(mapped.size, int(mapped.min()), int(mapped.max()), _exact_int_sum(mapped))
+        return Aggregate(estimate.size, float(estimate.min()), float(estimate.max()),
+                         float(np.sum(estimate)), exact=False)
+    mapped = transform(values)
+    return Aggregate(mapped.size, float(mapped.min()), float(mapped.max()), float(np.sum(mapped)))
+
+
+def aggregate_numpy(source: Source, transform='identity', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    dtype: str = None, start: int = 0, stop: int = None) -> Aggregate:
+    """
+    Vectorized pass over a source, one chunk of at most chunk_size values at a time
+
+    Integer sums are exact as long as each transformed value fits in int64;
+    otherwise that chunk is summed as floats and the result is marked inexact.
+
+    Args:
+        source: A range, a file path or any iterable of numbers
+        transform: Name from TRANSFORMS or a function that works on arrays
+        chunk_size: Values per chunk
+        dtype: NumPy dtype of a raw binary file; without it, files are read as text
+        start: First index to include, for ranges and binary files
+        stop: Index to stop before, for ranges and binary files
+    """
+    if np is None:
+        raise RuntimeError("aggregate_numpy needs NumPy")
+    transform = _resolve_transform(transform)
+    result = Aggregate()
+    for values in _numpy_chunks(source, chunk_size, dtype, start, stop):
+        result.merge(_aggregate_chunk(values, transform))
+    return result
+
+
+def _source_length(source: Source, dtype: str = None) -> int:
+    if isinstance(source, range):
+        return len(source)
+    if str(source).endswith('.npy'):
+        return np.load(source, mmap_mode='r').size
+    return os.path.getsize(source) // np.dtype(dtype).itemsize
+
+
+def _aggregate_part(source: Source, transform, chunk_size: int, dtype: Optional[str], start: int, stop: int):
+    """Worker process entry point: aggregate source[start:stop]"""
+    if np is not None:
+        return aggregate_numpy(source, transform, chunk_size, dtype, start, stop)
+    if isinstance(source, range):
+        return aggregate_python(source[start:stop], transform)
+    return aggregate_python(islice(read_binary(source, dtype, chunk_size), start, stop), transform)
+
+
+def aggregate_processes(source: Source, transform='identity', processes: int = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE, dtype: str = None) -> Aggregate:
+    """
+    Split a range or binary file across a process pool and merge the partial results
+
+    Each worker aggregates its slice with NumPy, or in plain Python without
+    it. Custom transforms must be module-level functions so they can be
+    pickled.
+    """
+    if not isinstance(source, range) and not (dtype or str(source).endswith('.npy')):
+        raise ValueError("aggregate_processes needs a range or a binary file")
+    if np is None and not isinstance(source, range) and str(source).endswith('.npy'):
+        raise RuntimeError(".npy files need NumPy")
+    processes = processes or os.cpu_count() or 1
+    length = len(source) if isinstance(source, range) else _source_length(source, dtype)
+    # A few parts per process evens out uneven progress
+    parts = max(1, min(length, processes * 4))
+    bounds = [length * i // parts for i in range(parts + 1)]
+    result = Aggregate()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_aggregate_part, source, transform, chunk_size, dtype, bounds[i], bounds[i + 1])
+                   for i in range(parts) if bounds[i] < bounds[i + 1]]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+def aggregate(source: Source, transform='identity', method: str = 'auto', **kwargs) -> Aggregate:
+    """
+    Count, min, max, sum and mean of a source's (transformed) values in constant memory
+
+    Args:
+        source: A range, a path to a text file with one number per line, a
+            path to a binary file (pass dtype, or use .npy), or any iterable
+        transform: 'identity', 'square', 'cube' or a function
+        method: 'python', 'numpy', 'processes', 'exact', or 'auto' to pick
+            closed form for ranges with a named power transform, then NumPy
+            when it is installed, then plain Python
+        kwargs: chunk_size, dtype and processes, for the methods that take them
+    """
+    if method == 'auto':
+        if isinstance(source, range) and transform in POWERS:
+            method = 'exact'
+        else:
+            method = 'numpy' if np is not None else 'python'
+    if method == 'exact':
+        return aggregate_range_exact(source, transform)
+    if method == 'numpy':
+        return aggregate_numpy(source, transform, **kwargs)
+    if method == 'processes':
+        return aggregate_processes(source, transform, **kwargs)
+    if method == 'python':
+        if isinstance(source, (str, Path)):
+            dtype = kwargs.get('dtype')
+            source = read_binary(source, dtype, kwargs.get('chunk_size', DEFAULT_CHUNK_SIZE)) if dtype \
+                else read_numbers(source)
+        return aggregate_python(source, transform)
+    raise ValueError(f"Unknown method: {method}")
+
+
+def list_approach(n: int, transform='identity') -> Aggregate:
+    """The list.py way: build the full list, then call min, max and sum on it"""
+    transform = _resolve_transform(transform)
+    values = []
+    for number in range(1, n + 1):
+        values.append(transform(number))
+    return Aggregate(len(values), min(values), max(values), sum(values))
+
+
+def main():
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description='Benchmark streaming aggregation against building a list')
+    parser.add_argument('--n', type=int, default=5_000_000, help='Size of range(1, n + 1) for the list comparison')
+    parser.add_argument('--big', type=int, default=1_000_000_000, help='Range size for the streaming-only runs')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    def timed(label: str, function, *function_args, **function_kwargs) -> Aggregate:
+        started = time.perf_counter()
+        result = function(*function_args, **function_kwargs)
+        print(f"  {label:<22}{time.perf_counter() - started:9.3f} s")
+        return result
+
+    for transform in ('identity', 'square', 'cube'):
+        print(f"range(1, {args.n + 1}), {transform}:")
+        expected = timed('list then min/max/sum', list_approach, args.n, transform)
+        source = range(1, args.n + 1)
+        assert timed('python stream', aggregate, source, transform, 'python') == expected
+        if np is not None:
+            numpy_result = timed('numpy chunks', aggregate, source, transform, 'numpy')
+            assert numpy_result == expected or not numpy_result.exact
+        processes_result = timed('process pool', aggregate, source, transform, 'processes', processes=args.processes)
+        assert processes_result == expected or not processes_result.exact
+        assert timed('closed form', aggregate, source, transform, 'exact') == expected
+
+    big = range(1, args.big + 1)
+    print(f"range(1, {args.big + 1}), identity (too big to build as a list):")
+    expected = timed('closed form', aggregate, big, 'identity', 'exact')
+    assert timed('process pool', aggregate, big, 'identity', 'processes', processes=args.processes) == expected
+    print(f"  {expected}")
+
+    if np is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'numbers.npy'
+            np.save(path, np.arange(1, args.n + 1, dtype=np.int64))
+            print(f"{path.name} with {args.n} int64 values, square:")
+            expected = aggregate_range_exact(range(1, args.n + 1), 'square')
+            assert timed('numpy memmap chunks', aggregate, path, 'square', 'numpy') == expected
+            assert timed('process pool', aggregate, path, 'square', 'processes', processes=args.processes) == expected
+
+
+if __name__ == '__main__':
+    main()
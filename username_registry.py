@@ -0,0 +1,286 @@
+"""
+Case-insensitive username registry for validating sign-up batches
+
+if-lists_p2.py checks each new username against every current one with a
+nested loop, lowercasing both sides on every comparison, so a batch costs
+O(n*m). UsernameRegistry keeps a hash index of casefolded names instead,
+making each check O(1). Validation streams, so batches of millions of
+candidates never need to be in memory at once. CompactRegistry is a
+read-only sorted snapshot that stores all names in one byte buffer plus an
+offset array, for registries too large to keep as a set of Python strings.
+
+Run this module to benchmark the registry against the nested loop.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Tuple
+import mmap
+import time
+import tracemalloc
+
+
+def normalize(username: str) -> str:
+    """Key a username is compared by: surrounding whitespace removed, casefolded"""
+    return username.strip().casefold()
+
+
+def read_usernames(path: str) -> Iterator[str]:
+    """Stream usernames from a file with one per line, skipping blank lines and # comments"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            name = line.strip()
+            if name and not name.startswith('#'):
+                yield name
+
+
+class UsernameRegistry:
+    """Set of registered usernames, indexed by casefolded name"""
+
+    def __init__(self, usernames: Iterable[str] = ()):
+        self._index = set()
+        self.import_names(usernames)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, username: str) -> bool:
+        return normalize(username) in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def is_available(self, username: str) -> bool:
+        return normalize(username) not in self._index
+
+    def add(self, username: str) -> bool:
+        """
+        Register a username
+
+        Returns:
+            False if it was already taken, in any casing
+        """
+        key = normalize(username)
+        if key in self._index:
+            return False
+        self._index.add(key)
+        return True
+
+    def import_names(self, usernames: Iterable[str]) -> int:
+        """Register many usernames, returning how many were new"""
+        before = len(self._index)
+        self._index.update(map(normalize, usernames))
+        return len(self._index) - before
+
+    def bulk_import(self, path: str) -> int:
+        """Register the usernames in a file, returning how many were new"""
+        return self.import_names(read_usernames(path))
+
+    def validate(self, candidates: Iterable[str], register: bool = False) -> Iterator[Tuple[str, bool]]:
+        """
+        Check candidates one at a time as they arrive
+
+        Args:
+            candidates: Usernames to check, e.g. a generator over a huge file
+            register: Add available names as they are seen, so a batch
+                cannot claim the same name twice
+
+        Yields:
+            (username, available) for every candidate, in order
+        """
+        index = self._index
+        for username in candidates:
+            key = normalize(username)
+            available = key not in index
+            if available and register:
+                index.add(key)
+            yield username, available
+
+    def validate_file(self, path: str, register: bool = False) -> Iterator[Tuple[str, bool]]:
+        """validate() over the usernames in a file"""
+        return self.validate(read_usernames(path), register)
+
+    def compact(self) -> 'CompactRegistry':
+        """Read-only sorted snapshot of the registry"""
+        return CompactRegistry.from_keys(self._index)
+
+
+class CompactRegistry:
+    """
+    Read-only sorted username index in two flat buffers
+
+    Casefolded names are sorted, UTF-8 encoded and packed back to back into
+    one bytes buffer, with an array of their start offsets and an array of
+    their first 8 bytes as integers. That costs the name bytes plus 16 bytes
+    each, instead of a Python string and a set slot per name. Lookups binary
+    search the prefix array in C, then compare full names only among the few
+    sharing a prefix. Snapshots saved with save() can be loaded through mmap,
+    so only the two arrays are read into memory.
+    """
+    MAGIC = b'UREG2\n'
+
+    def __init__(self, offsets: array, prefixes: array, data):
+        """
+        Args:
+            offsets: Start of every name in data, plus the end of the last one
+            prefixes: First 8 bytes of every name, zero padded, as big-endian integers
+            data: The sorted names, back to back (bytes or a memoryview of an mmap)
+        """
+        self._offsets = offsets
+        self._prefixes = prefixes
+        self._data = data
+
+    @staticmethod
+    def _prefix(name: bytes) -> int:
+        return int.from_bytes(name[:8].ljust(8, b'\0'), 'big')
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[str]) -> 'CompactRegistry':
+        """Build from already normalized usernames"""
+        encoded = [key.encode('utf-8') for key in sorted(set(keys))]
+        offsets = array('Q', [0])
+        prefixes = array('Q')
+        position = 0
+        for name in encoded:
+            position += len(name)
+            offsets.append(position)
+            prefixes.append(cls._prefix(name))
+        return cls(offsets, prefixes, b''.join(encoded))
+
+    @classmethod
+    def from_usernames(cls, usernames: Iterable[str]) -> 'CompactRegistry':
+        return cls.from_keys(map(normalize, usernames))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _name(self, i: int) -> bytes:
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]])
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self._name(i).decode('utf-8')
+
+    def __contains__(self, username: str) -> bool:
+        key = normalize(username).encode('utf-8')
+        prefix = self._prefix(key)
+        lo = bisect_left(self._prefixes, prefix)
+        hi = bisect_right(self._prefixes, prefix, lo)
+        end = hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < end and self._name(lo) == key
+
+    def is_available(self, username: str) -> bool:
+        return username not in self
+
+    def nbytes(self) -> int:
+        """Memory held by the names and both arrays"""
+        return len(self._data) + self._offsets.itemsize * (len(self._offsets) + len(self._prefixes))
+
+    def validate(self, candidates: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+        """Yield (username, available) for every candidate, in order"""
+        for username in candidates:
+            yield username, username not in self
+
+    def save(self, path: str):
+        """Write the snapshot as magic, name count, offsets, prefixes and names"""
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(array('Q', [len(self)]).tobytes())
+            self._offsets.tofile(f)
+            self._prefixes.tofile(f)
+            f.write(self._data)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompactRegistry':
+        """Open a saved snapshot, mapping its names instead of reading them"""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a username registry snapshot")
+            count = array('Q')
+            count.fromfile(f, 1)
+            offsets = array('Q')
+            offsets.fromfile(f, count[0] + 1)
+            prefixes = array('Q')
+            prefixes.fromfile(f, count[0])
+            header_size = f.tell()
+            if offsets[-1] == 0:
+                return cls(offsets, prefixes, b'')
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Offsets are relative to the names, which start after the arrays
+        return cls(offsets, prefixes, memoryview(data)[header_size:].toreadonly())
+
+
+def nested_loop_check(new_users: List[str], current_users: List[str]) -> List[Tuple[str, bool]]:
+    """The duplicate check from if-lists_p2.py, kept as the benchmark baseline"""
+    results = []
+    for new_user in new_users:
+        duplicate = False
+        for current_user in current_users:
+            if new_user.lower() == current_user.lower():
+                duplicate = True
+                break
+        results.append((new_user, not duplicate))
+    return results
+
+
+def _sample_usernames(count: int, start: int = 0) -> List[str]:
+    return [f"User{i:x}_{i % 97}" for i in range(start, start + count)]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark username duplicate checks')
+    parser.add_argument('--current', type=int, default=5000, help='Registered users for the nested-loop comparison')
+    parser.add_argument('--new', type=int, default=5000, help='Candidates for the nested-loop comparison')
+    parser.add_argument('--scale', type=int, default=1000000, help='Registered users and candidates for the large run')
+    args = parser.parse_args()
+
+    current = _sample_usernames(args.current)
+    # Half the candidates clash with existing names in a different case
+    new = [name.upper() for name in current[:args.new // 2]] + _sample_usernames(args.new - args.new // 2, args.current)
+
+    started = time.perf_counter()
+    expected = nested_loop_check(new, current)
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    registry = UsernameRegistry(current)
+    results = list(registry.validate(new))
+    registry_seconds = time.perf_counter() - started
+    assert results == expected
+    print(f"{args.new} candidates against {args.current} users:")
+    print(f"  nested loop  {loop_seconds:8.3f} s")
+    print(f"  registry     {registry_seconds:8.3f} s  ({loop_seconds / registry_seconds:.0f}x faster)")
+
+    current = _sample_usernames(args.scale)
+    tracemalloc.start()
+    started = time.perf_counter()
+    registry = UsernameRegistry(current)
+    build_seconds = time.perf_counter() - started
+    registry_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    taken = sum(not available for _, available in
+                registry.validate(name.swapcase() for name in _sample_usernames(args.scale, args.scale // 2)))
+    validate_seconds = time.perf_counter() - started
+    compact = registry.compact()
+    started = time.perf_counter()
+    compact_taken = sum(not available for _, available in
+                        compact.validate(name.swapcase() for name in _sample_usernames(args.scale, args.scale // 2)))
+    compact_seconds = time.perf_counter() - started
+    assert taken == compact_taken
+    print(f"{args.scale} candidates against {args.scale} users ({taken} taken):")
+    print(f"  registry build     {build_seconds:8.3f} s  ({registry_bytes} bytes)")
+    print(f"  registry validate  {validate_seconds:8.3f} s")
+    print(f"  compact validate   {compact_seconds:8.3f} s  "
+          f"({compact.nbytes()} bytes)")
+
+
+if __name__ == '__main__':
+    main()